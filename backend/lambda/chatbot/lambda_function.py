@@ -13,12 +13,93 @@ from typing import Dict, List, Tuple
 from decimal import Decimal
 from datetime import datetime, timezone, timedelta, date
 from boto3.dynamodb.conditions import Key, Attr
+from botocore.config import Config
+from botocore.exceptions import ClientError
 import logging
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# orjson (chatbot layer) is much faster for Bedrock payloads; fall back to stdlib json
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Set up logger
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# AWS clients are created once per container and reused across warm invocations.
+# TCP keep-alive lets warm invocations reuse connections instead of re-handshaking.
+_REGION = os.environ.get('AWS_REGION', 'us-west-2')
+_CLIENT_CONFIG = Config(
+    tcp_keepalive=True,
+    retries={'mode': 'adaptive', 'max_attempts': 5},
+    max_pool_connections=32
+)
+_BEDROCK = boto3.client('bedrock-runtime', region_name=_REGION, config=_CLIENT_CONFIG)
+_BEDROCK_AGENT = boto3.client('bedrock-agent-runtime', region_name=_REGION, config=_CLIENT_CONFIG)
+_S3 = boto3.client('s3', region_name=_REGION)
+_DDB = boto3.resource('dynamodb', region_name=_REGION, config=_CLIENT_CONFIG)
+_TABLE_NAME = os.environ.get('DYNAMODB_TABLE')
+_TABLE = _DDB.Table(_TABLE_NAME) if _TABLE_NAME else None
+# Resource objects aren't thread-safe, so calls made on _EXEC workers go through the
+# resource's client. It still takes and returns plain Python types, but string
+# expressions are used since the Key/Attr condition builder it shares isn't thread-safe.
+_DDB_CLIENT = _DDB.meta.client
+
+# Worker pool for overlapping independent I/O within a request
+_EXEC = ThreadPoolExecutor(max_workers=4)
+
+# GSI (session_id, message_id) used to locate a message for feedback
+MESSAGE_ID_INDEX = os.environ.get('MESSAGE_ID_INDEX', 'session_id-message_id-index')
+
+# Prompt templates and model settings are fixed per deployment, so read them once.
+# Templates use str.format placeholders ({user_input}, {context}, ...) from config.yaml,
+# so their bound format methods are kept rather than converting to string.Template.
+USE_CLASSIFIER = os.environ.get('USE_CLASSIFIER', 'false').lower() == 'true'
+CLASSIFIER_MODEL_ID = os.environ.get('CLASSIFIER_MODEL_ID', 'us.amazon.nova-lite-v1:0')
+RAG_MODEL_ID = os.environ.get('RAG_MODEL_ID', 'anthropic.claude-3-5-sonnet-20241022-v2:0')
+_CLASSIFIER_TMPL = os.environ.get('CLASSIFIER_PROMPT', 'Classify this message as greeting, farewell, or knowledge_base: {user_input}').format
+_SYSTEM_TMPL = os.environ.get('SYSTEM_PROMPT', 'You are a helpful assistant.').format
+
+# Fixed Nova classification request body, split around the prompt text
+_NOVA_PREFIX = b'{"messages":[{"role":"user","content":[{"text":'
+_NOVA_SUFFIX = b'}]}],"inferenceConfig":{"maxTokens":10,"temperature":0.1,"topP":0.9}}'
+
+# Obvious greetings/farewells are classified locally, skipping the Nova round trip
+GREETING_PATTERN = re.compile(
+    r"\s*(hi|hello|hey|howdy|hiya|greetings|good (morning|afternoon|evening))( there)?[!.?\s]*",
+    re.IGNORECASE
+)
+FAREWELL_PATTERN = re.compile(
+    r"\s*(bye|goodbye|good bye|bye bye|see you( later)?|thanks|thank you|thanks a lot|thank you so much|cheers)[!.?\s]*",
+    re.IGNORECASE
+)
+
+# Recent KB retrievals keyed by (kb_id, normalized query, filter) -> (response, fetched_at).
+# Shared across warm invocations and guarded by a lock since retrieval runs on _EXEC.
+KB_CACHE_TTL_SECONDS = 300
+KB_CACHE_MAX_ENTRIES = 256
+_KB_CACHE = OrderedDict()
+_KB_CACHE_LOCK = threading.Lock()
+
+# Nova classifications keyed by normalized message text, shared across warm invocations
+CLASSIFICATION_CACHE_MAX_ENTRIES = 512
+_CLASSIFICATION_CACHE = OrderedDict()
+_CLASSIFICATION_CACHE_LOCK = threading.Lock()
+
+# Precision for response times stored in DynamoDB
+CENTS = Decimal('0.01')
+
+# Only conversation turns newer than this are loaded as history
+HISTORY_WINDOW = timedelta(days=1)
+
+# Sort key of the per-session message counter item; sorts before any ISO timestamp
+COUNTER_SORT_KEY = '#counter'
+
 def lambda_handler(event, context):
     """Main Lambda handler for chat requests and feedback with full functionality"""
     
@@ -26,16 +107,23 @@ def lambda_handler(event, context):
     if event.get('httpMethod') == 'OPTIONS':
         return {
             'statusCode': 200,
-            'headers': get_cors_headers(),
+            'headers': _CORS_HEADERS,
             'body': ''
         }
     
     try:
-        # Parse request body
+        # Parse request body; malformed input is a client error, not a 500
         if isinstance(event.get('body'), str):
-            body = json.loads(event['body'])
+            try:
+                body = json.loads(event['body'])
+            except ValueError:
+                return create_error_response(400, "Request body must be valid JSON")
         else:
-            body = event.get('body', {})
+            body = event.get('body')
+        if body is None:
+            body = {}
+        if not isinstance(body, dict):
+            return create_error_response(400, "Request body must be a JSON object")
         
         # Determine the path to route to appropriate handler
         path = event.get('path', '').rstrip('/')
@@ -46,8 +134,8 @@ def lambda_handler(event, context):
             return handle_feedback_request(body)
         
         # Otherwise handle as chat request (existing logic)
-        message = body.get('message', '').strip()
-        session_id = body.get('sessionId', str(uuid.uuid4()))
+        message = str(body.get('message') or '').strip()
+        session_id = str(body.get('sessionId') or uuid.uuid4())
         
         if not message or not session_id:
             return create_error_response(400, "Message/Session ID is missing")
@@ -60,8 +148,9 @@ def lambda_handler(event, context):
         
         return {
             'statusCode': 200,
-            'headers': get_cors_headers(),
-            'body': json.dumps(result, default=decimal_default)
+            'headers': _CORS_HEADERS,
+            # Result holds only native types (Decimals live at the DynamoDB boundary)
+            'body': json_dumps(result, default=None)
         }
         
     except Exception as e:
@@ -93,7 +182,7 @@ def handle_feedback_request(body: Dict) -> Dict:
         if success:
             return {
                 'statusCode': 200,
-                'headers': get_cors_headers(),
+                'headers': _CORS_HEADERS,
                 'body': json.dumps({
                     'success': True,
                     'message': 'Feedback saved successfully'
@@ -106,14 +195,13 @@ def handle_feedback_request(body: Dict) -> Dict:
         logger.error(f"Error handling feedback request: {str(e)}")
         return create_error_response(500, f"Error saving feedback: {str(e)}")
 
-def get_cors_headers():
-    """Return standard CORS headers"""
-    return {
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
-        'Access-Control-Allow-Methods': 'OPTIONS,POST,GET',
-        'Content-Type': 'application/json'
-    }
+# Standard CORS headers, shared by every response (plain dict so the runtime can serialize it)
+_CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+    'Access-Control-Allow-Methods': 'OPTIONS,POST,GET',
+    'Content-Type': 'application/json'
+}
 
 def decimal_default(obj):
     """Handle Decimal serialization for JSON"""
@@ -121,48 +209,97 @@ def decimal_default(obj):
         return float(obj)
     raise TypeError
 
+def json_dumps(obj, default=decimal_default) -> str:
+    """Serialize to JSON, converting Decimals to floats (pass default=None for plain data)"""
+    if orjson:
+        return orjson.dumps(obj, default=default).decode()
+    return json.dumps(obj, default=default)
+
+def json_dumps_bytes(obj) -> bytes:
+    """Serialize to UTF-8 JSON bytes, e.g. for Bedrock request bodies"""
+    if orjson:
+        return orjson.dumps(obj, default=decimal_default)
+    return json.dumps(obj, default=decimal_default).encode()
+
+def read_json_body(response) -> Dict:
+    """Parse a Bedrock StreamingBody straight from its bytes, without decoding to str"""
+    return json_loads(response['body'].read())
+
+def json_loads(data):
+    """Parse JSON from str or bytes"""
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
 def create_error_response(status_code, message):
     """Create standardized error response"""
     return {
         'statusCode': status_code,
-        'headers': get_cors_headers(),
+        'headers': _CORS_HEADERS,
         'body': json.dumps({
             'error': message,
             'success': False
         })
     }
 
+def is_small_talk(user_input: str):
+    """'greeting' or 'farewell' if the local patterns classify the message, otherwise None"""
+    if not USE_CLASSIFIER:
+        return None
+    if GREETING_PATTERN.fullmatch(user_input):
+        return 'greeting'
+    if FAREWELL_PATTERN.fullmatch(user_input):
+        return 'farewell'
+    return None
+
+def classify_with_nova(user_input: str) -> str:
+    """Classify user input with Nova (errors propagate, so callers don't cache failures)"""
+    classification_prompt = _CLASSIFIER_TMPL(user_input=user_input)
+
+    # Only the prompt varies, so splice its JSON string into the fixed request body
+    body = _NOVA_PREFIX + json_dumps_bytes(classification_prompt) + _NOVA_SUFFIX
+    
+    response = _BEDROCK.invoke_model(
+        modelId=CLASSIFIER_MODEL_ID,
+        contentType="application/json",
+        body=body
+    )
+    
+    response_body = read_json_body(response)
+    classification = response_body['output']['message']['content'][0]['text'].strip().lower()
+    
+    # Validate the classification result
+    valid_categories = ['greeting', 'farewell', 'knowledge_base']
+    if classification in valid_categories:
+        return classification
+    else:
+        return 'knowledge_base'
+
 class GenericChatbot:
     def __init__(self):
-        self.bedrock_client = None
-        self.bedrock_agent_runtime = None
-        self.dynamodb = None
-        self.s3_client = None
-        self.table = None
-        self.initialize_aws_clients()
-    
-    def initialize_aws_clients(self):
-        """Initialize AWS clients"""
-        try:
-            region = os.environ.get('AWS_REGION', 'us-west-2')
-            
-            self.bedrock_client = boto3.client('bedrock-runtime', region_name=region)
-            self.bedrock_agent_runtime = boto3.client('bedrock-agent-runtime', region_name=region)
-            self.s3_client = boto3.client('s3', region_name=region)
-            self.dynamodb = boto3.resource('dynamodb', region_name=region)
-            self.table = self.dynamodb.Table(os.environ.get('DYNAMODB_TABLE'))
-            
-        except Exception as e:
-            logger.error(f"Failed to initialize AWS clients: {str(e)}")
-            raise
+        self.bedrock_client = _BEDROCK
+        self.bedrock_agent_runtime = _BEDROCK_AGENT
+        self.ddb_client = _DDB_CLIENT
+        self.s3_client = _S3
+        self.table = _TABLE
+        self._presign_cache = {}
     
     def process_chat_request(self, message: str, session_id: str) -> Dict:
         """Main method to process chat request with full functionality"""
         start_time = time.time()
+        counter_future = None
         
         try:
-            # Step 1: Get conversation history
-            conversation_history = self.get_conversation_history(session_id)
+            # Steps 1-3 are independent I/O, so run them concurrently:
+            # history fetch, Nova classification, and a speculative KB retrieval
+            # whose result is only used if the query classifies as knowledge_base.
+            # Messages the local patterns already classify skip the retrieval entirely.
+            history_future = _EXEC.submit(self.get_conversation_history, session_id)
+            counter_future = _EXEC.submit(self.get_message_counter, session_id)
+            knowledge_base_id = os.environ.get('KNOWLEDGE_BASE_ID')
+            kb_future = None
+            if knowledge_base_id and not is_small_talk(message):
+                kb_future = _EXEC.submit(self.query_knowledge_base, message, knowledge_base_id)
             
             # Step 2: Classify query using Nova
             query_type = self.classify_query_with_nova(message)
@@ -170,13 +307,13 @@ class GenericChatbot:
             # Step 3: Get context from knowledge base if needed
             context = ""
             sources = []
-            kb_response_school_specific = {}
             
-            if query_type == 'knowledge_base':
-                knowledge_base_id = os.environ.get('KNOWLEDGE_BASE_ID')
-                if knowledge_base_id:
-                    kb_response = self.query_knowledge_base(message, knowledge_base_id)
-                    context, sources = self.process_knowledge_base_response([kb_response])
+            if query_type == 'knowledge_base' and kb_future:
+                kb_response = kb_future.result()
+                context, sources = self.process_knowledge_base_response([kb_response])
+            
+            # Step 1: Get conversation history
+            conversation_history = history_future.result()
             
             # Step 4: Generate response with conversation context
             conversation_context = self.format_conversation_context(conversation_history)
@@ -184,10 +321,13 @@ class GenericChatbot:
                 message, context, query_type, conversation_context
             )
             
-            total_time = round(time.time() - start_time, 2)
+            total_time = round(time.time() - start_time, 2)  # float; converted to Decimal only when saved
             
             # Step 6: Save conversation to DynamoDB
-            message_id = self.save_conversation_to_dynamodb(session_id, message, response_text, sources, total_time, query_type)
+            message_id = self.save_conversation_to_dynamodb(
+                session_id, message, response_text, sources, total_time, query_type,
+                message_counter=counter_future.result()
+            )
             
             return {
                 'success': True,
@@ -202,7 +342,13 @@ class GenericChatbot:
         except Exception as e:
             logging.error(f"Error in process_chat_request: {str(e)}")
             error_response = "I'm sorry, I encountered an error while processing your request. Please try again."
-            message_id = self.save_conversation_to_dynamodb(session_id, message, error_response, [], 0, 'error')
+            # Reuse the prefetched counter when it's ready rather than falling back to the COUNT query
+            message_counter = 0
+            if counter_future is not None and counter_future.done() and not counter_future.exception():
+                message_counter = counter_future.result()
+            message_id = self.save_conversation_to_dynamodb(
+                session_id, message, error_response, [], 0, 'error', message_counter=message_counter
+            )
             return {
                 'success': False,
                 'response': error_response,
@@ -214,20 +360,29 @@ class GenericChatbot:
             }
     
     def get_conversation_history(self, session_id: str) -> List[Dict]:
-        """Retrieve conversation history from DynamoDB"""
+        """Retrieve conversation history from DynamoDB (runs on an _EXEC worker)"""
         try:
-            # Get conversation items
-            response = self.table.query(
-                KeyConditionExpression=Key('session_id').eq(session_id),
+            # Get the most recent conversation items, only the fields we use.
+            # The timestamp bound lets DynamoDB skip older items (and the counter item) by key.
+            cutoff = (datetime.now(timezone.utc) - HISTORY_WINDOW).isoformat()
+            response = self.ddb_client.query(
+                TableName=_TABLE_NAME,
+                KeyConditionExpression='session_id = :sid AND #t > :cutoff',
+                FilterExpression='item_type = :conversation',
+                ProjectionExpression='user_message, assistant_response, #t',
+                ExpressionAttributeNames={'#t': 'timestamp'},
+                ExpressionAttributeValues={
+                    ':sid': session_id,
+                    ':cutoff': cutoff,
+                    ':conversation': 'conversation'
+                },
                 ScanIndexForward=False,
                 Limit=6
             )
             
-            # Reverse to get chronological order
-            items = list(reversed(response.get('Items', [])))
-            
             history = []
-            for item in items:
+            # Walk newest-first results backwards for chronological order
+            for item in reversed(response.get('Items', [])):
                 # Add user message
                 history.append({
                     'role': 'user',
@@ -249,26 +404,34 @@ class GenericChatbot:
     
     def save_conversation_to_dynamodb(self, session_id: str, user_message: str, 
                                     assistant_response: str, sources: list, 
-                                    response_time: float, query_type: str) -> str:
+                                    response_time: float, query_type: str,
+                                    message_counter: int = 0) -> str:
         """Save conversation exchange to DynamoDB and return message ID"""
         try:
             timestamp = datetime.now(timezone.utc).isoformat()
             
-            # Get next message ID for this session
-            message_id = self.get_next_message_id(session_id)
-            
             conversation_item = {
                 'session_id': str(session_id),
-                'timestamp': str(timestamp),
-                'message_id': message_id,
+                'timestamp': timestamp,
                 'user_message': str(user_message),
                 'assistant_response': str(assistant_response),
                 'query_type': str(query_type),
-                'response_time_seconds': Decimal(str(round(response_time, 2))),
-                'created_at': str(timestamp),
+                'response_time_seconds': Decimal(response_time).quantize(CENTS),
+                'created_at': timestamp,
                 'item_type': 'conversation'
             }
             
+            # With the counter read earlier in the request, bump it and put the item in one round trip
+            if message_counter:
+                message_id = f"conv{message_counter + 1}"
+                conversation_item['message_id'] = message_id
+                if self.transact_save_conversation(session_id, message_counter, conversation_item):
+                    return message_id
+            
+            # Get next message ID for this session
+            message_id = self.get_next_message_id(session_id, message_counter)
+            conversation_item['message_id'] = message_id
+            
             self.table.put_item(Item=conversation_item)
             return message_id
             
@@ -284,8 +447,11 @@ class GenericChatbot:
             
             # Find the conversation item by session_id and message_id
             response = self.table.query(
-                KeyConditionExpression=Key('session_id').eq(session_id),
-                FilterExpression=Attr('message_id').eq(message_id)
+                IndexName=MESSAGE_ID_INDEX,
+                KeyConditionExpression=Key('session_id').eq(session_id) & Key('message_id').eq(message_id),
+                ProjectionExpression='#t',
+                ExpressionAttributeNames={'#t': 'timestamp'},
+                Limit=1
             )
             
             if not response['Items']:
@@ -319,83 +485,138 @@ class GenericChatbot:
             return False
     
 
-    def get_next_message_id(self, session_id: str) -> str:
-        """Get the next sequential message ID for a session"""
+    def transact_save_conversation(self, session_id: str, message_counter: int, conversation_item: Dict) -> bool:
+        """Advance the session counter and put the item atomically; False if the counter moved or the write failed"""
+        client = self.ddb_client
         try:
-            # Query existing conversation messages for this session to get count
-            response = self.table.query(
-                KeyConditionExpression=Key('session_id').eq(session_id),
-                Select='COUNT'
+            client.transact_write_items(TransactItems=[
+                {
+                    'Update': {
+                        'TableName': _TABLE_NAME,
+                        'Key': {
+                            'session_id': session_id,
+                            'timestamp': COUNTER_SORT_KEY
+                        },
+                        'UpdateExpression': 'SET msg_counter = :next',
+                        'ConditionExpression': 'msg_counter = :current',
+                        'ExpressionAttributeValues': {
+                            ':next': Decimal(message_counter + 1),
+                            ':current': Decimal(message_counter)
+                        }
+                    }
+                },
+                {
+                    'Put': {
+                        'TableName': _TABLE_NAME,
+                        'Item': conversation_item
+                    }
+                }
+            ])
+            return True
+        except client.exceptions.TransactionCanceledException:
+            logger.info(f"Message counter changed for session {session_id}, retrying with atomic counter")
+            return False
+        except ClientError as e:
+            logger.warning(f"Transactional save failed for session {session_id}, retrying with atomic counter: {str(e)}")
+            return False
+    
+    def get_message_counter(self, session_id: str) -> int:
+        """Current value of the session's message counter, 0 if it has none yet (runs on an _EXEC worker)"""
+        try:
+            response = self.ddb_client.get_item(
+                TableName=_TABLE_NAME,
+                Key={'session_id': session_id, 'timestamp': COUNTER_SORT_KEY},
+                ProjectionExpression='msg_counter'
             )
+            return int(response.get('Item', {}).get('msg_counter', 0))
+        except Exception as e:
+            logging.error(f"Error reading message counter: {str(e)}")
+            return 0
+    
+    def get_next_message_id(self, session_id: str, message_counter: int = 0) -> str:
+        """Get the next sequential message ID for a session"""
+        try:
+            if message_counter:
+                # Atomically increment the session's counter item
+                update = 'ADD msg_counter :one SET item_type = :counter'
+                values = {':one': Decimal(1), ':counter': 'counter'}
+            else:
+                # No counter yet: count messages saved before counters existed, then
+                # create and bump it in one write. If another request created it
+                # meanwhile, if_not_exists keeps its value and this just increments it.
+                update = 'SET msg_counter = if_not_exists(msg_counter, :existing) + :one, item_type = :counter'
+                values = {
+                    ':existing': Decimal(self.count_conversation_messages(session_id)),
+                    ':one': Decimal(1),
+                    ':counter': 'counter'
+                }
             
-            # Next message number is count + 1
-            next_number = response.get('Count', 0) + 1
-            return f"conv{next_number}"
+            response = self.table.update_item(
+                Key={'session_id': session_id, 'timestamp': COUNTER_SORT_KEY},
+                UpdateExpression=update,
+                ExpressionAttributeValues=values,
+                ReturnValues='UPDATED_NEW'
+            )
+            return f"conv{int(response['Attributes']['msg_counter'])}"
             
         except Exception as e:
             logging.error(f"Error generating message ID: {str(e)}")
             # Fallback to timestamp-based ID if query fails
             return f"msg{int(time.time())}"
     
+    def count_conversation_messages(self, session_id: str) -> int:
+        """Number of conversation items already saved for the session"""
+        query = {
+            'KeyConditionExpression': Key('session_id').eq(session_id),
+            'FilterExpression': Attr('item_type').eq('conversation'),
+            'Select': 'COUNT'
+        }
+        count = 0
+        while True:
+            response = self.table.query(**query)
+            count += response.get('Count', 0)
+            if 'LastEvaluatedKey' not in response:
+                return count
+            query['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    
     def format_conversation_context(self, conversation_history: List[Dict]) -> str:
         """Format conversation history for Claude context"""
         if not conversation_history:
             return ""
         
         # Use last 6 messages max for context
-        recent_messages = conversation_history[-6:]
-        
-        context = ""
-        for msg in recent_messages:
-            role = "Human" if msg['role'] == 'user' else "Assistant"
-            content = msg['content']
-            context += f"{role}: {content}\n"
-        
-        return context
+        return ''.join(
+            f"{'Human' if msg['role'] == 'user' else 'Assistant'}: {msg['content']}\n"
+            for msg in conversation_history[-6:]
+        )
     
     def classify_query_with_nova(self, user_input: str) -> str:
         """Classify the user query using Nova Pro/Lite"""
         # Check if classifier is enabled
-        use_classifier = os.environ.get('USE_CLASSIFIER', 'false').lower() == 'true'
-        if not use_classifier:
+        if not USE_CLASSIFIER:
             return 'knowledge_base'
             
+        local_type = is_small_talk(user_input)
+        if local_type:
+            return local_type
+        
+        # Normalize the cache key so repeated phrasings ("Hi", "hi ") share an entry,
+        # but send Nova the message as the user wrote it
+        cache_key = user_input.strip().lower()
+        with _CLASSIFICATION_CACHE_LOCK:
+            classification = _CLASSIFICATION_CACHE.get(cache_key)
+            if classification:
+                _CLASSIFICATION_CACHE.move_to_end(cache_key)
+                return classification
+        
         try:
-            # Get classifier prompt from environment and format it
-            classifier_prompt_template = os.environ.get('CLASSIFIER_PROMPT', 'Classify this message as greeting, farewell, or knowledge_base: {user_input}')
-            classification_prompt = classifier_prompt_template.format(user_input=user_input)
-
-            body = json.dumps({
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": [{"text": classification_prompt}]
-                    }
-                ],
-                "inferenceConfig": {
-                    "maxTokens": 10,
-                    "temperature": 0.1,
-                    "topP": 0.9
-                }
-            })
+            classification = classify_with_nova(user_input)
+            with _CLASSIFICATION_CACHE_LOCK:
+                _CLASSIFICATION_CACHE[cache_key] = classification
+                if len(_CLASSIFICATION_CACHE) > CLASSIFICATION_CACHE_MAX_ENTRIES:
+                    _CLASSIFICATION_CACHE.popitem(last=False)
+            return classification
             
-            classifier_model_id = os.environ.get('CLASSIFIER_MODEL_ID', 'us.amazon.nova-lite-v1:0')
-            response = self.bedrock_client.invoke_model(
-                modelId=classifier_model_id,
-                contentType="application/json",
-                body=body
-            )
-            
-            response_body = json.loads(response['body'].read())
-            classification = response_body['output']['message']['content'][0]['text'].strip().lower()
-            
-            # Validate the classification result
-            valid_categories = ['greeting', 'farewell', 'knowledge_base']
-            if classification in valid_categories:
-                return classification
-            else:
-                return 'knowledge_base'
-                
         except Exception as e:
             logging.error(f"Error classifying query with Nova: {str(e)}")
             # Fallback to knowledge_base if Nova fails
@@ -403,6 +624,14 @@ class GenericChatbot:
     
     def query_knowledge_base(self, query: str, knowledge_base_id: str, metadata_filter: str = None) -> Dict:
         """Query Knowledge Base using configurable search type"""
+        cache_key = (knowledge_base_id, query.strip().lower(), metadata_filter)
+        now = time.time()
+        with _KB_CACHE_LOCK:
+            hit = _KB_CACHE.get(cache_key)
+            if hit and now - hit[1] < KB_CACHE_TTL_SECONDS:
+                _KB_CACHE.move_to_end(cache_key)
+                return hit[0]
+        
         try:
             # Get search configuration from environment
             search_type = os.environ.get('SEARCH_TYPE', 'SEMANTIC')
@@ -428,7 +657,13 @@ class GenericChatbot:
                 knowledgeBaseId=knowledge_base_id,
                 retrievalQuery={'text': query},
                 retrievalConfiguration=retrieval_config
-            )            
+            )
+            
+            with _KB_CACHE_LOCK:
+                _KB_CACHE[cache_key] = (response, now)
+                _KB_CACHE.move_to_end(cache_key)
+                if len(_KB_CACHE) > KB_CACHE_MAX_ENTRIES:
+                    _KB_CACHE.popitem(last=False)
             return response
             
         except Exception as e:
@@ -438,7 +673,7 @@ class GenericChatbot:
     def process_knowledge_base_response(self, kb_responses: List[Dict]) -> Tuple[str, List]:
         """Process multiple knowledge base responses and extract context and sources"""
         try:
-            context = ""
+            context_parts = []
             sources = []
             source_counter = 1
             
@@ -451,7 +686,7 @@ class GenericChatbot:
                             chunk_text = result['content']['text']
 
                             # Add metadata to the context if needed
-                            context += f"[Source {source_counter}]: {chunk_text}\n\n"
+                            context_parts.append(f"[Source {source_counter}]: {chunk_text}\n\n")
                             
                             # Extract source metadata
                             source_info = {
@@ -470,7 +705,10 @@ class GenericChatbot:
                                     source_info["s3Uri"] = s3_uri
                                     
                                     # Generate pre-signed URL with page number if available
-                                    presigned_url = self.generate_presigned_url(s3_uri)
+                                    # Several chunks often come from the same document
+                                    presigned_url = self._presign_cache.get(s3_uri)
+                                    if presigned_url is None:
+                                        presigned_url = self._presign_cache[s3_uri] = self.generate_presigned_url(s3_uri)
                                     page_number = result.get('metadata', {}).get('x-amz-bedrock-kb-document-page-number')
                                     if page_number and presigned_url:
                                         source_info["presignedUrl"] = f"{presigned_url}#page={page_number}"
@@ -482,7 +720,7 @@ class GenericChatbot:
                         else:
                             break
             
-            return context, sources
+            return ''.join(context_parts), sources
         
         except Exception as e:
             logging.error(f"Error processing knowledge base responses: {str(e)}")
@@ -494,9 +732,7 @@ class GenericChatbot:
             if not s3_uri.startswith('s3://'):
                 return None
                 
-            s3_path = s3_uri[5:]
-            bucket_name = s3_path.split('/')[0]
-            object_key = '/'.join(s3_path.split('/')[1:])
+            bucket_name, _, object_key = s3_uri[5:].partition('/')
             
             presigned_url = self.s3_client.generate_presigned_url(
                 'get_object',
@@ -522,9 +758,7 @@ class GenericChatbot:
                 response_text = os.environ.get('FAREWELL_RESPONSE', 'Thank you! Have a great day!')
                 
             else:  # knowledge_base
-                # Get system prompt from environment variables and format it
-                system_prompt_template = os.environ.get('SYSTEM_PROMPT', 'You are a helpful assistant.')
-                prompt = system_prompt_template.format(
+                prompt = _SYSTEM_TMPL(
                     current_date=date.today(),
                     conversation_context=conversation_context,
                     context=context,
@@ -539,14 +773,13 @@ class GenericChatbot:
                     "anthropic_version": "bedrock-2023-05-31"
                 }
                 
-                rag_model_id = os.environ.get('RAG_MODEL_ID', 'anthropic.claude-3-5-sonnet-20241022-v2:0')
                 response = self.bedrock_client.invoke_model(
-                    modelId=rag_model_id,
-                    body=json.dumps(body),
+                    modelId=RAG_MODEL_ID,
+                    body=json_dumps_bytes(body),
                     contentType='application/json'
                 )
                 
-                response_body = json.loads(response['body'].read())
+                response_body = read_json_body(response)
                 response_text = response_body['content'][0]['text']
             
             response_time = round(time.time() - start_time, 2)
@@ -554,4 +787,4 @@ class GenericChatbot:
                 
         except Exception as e:
             logging.error(f"Error generating response: {str(e)}")
-            return "I'm sorry, I encountered an error while processing your request. Please try again or contact support for assistance.", 0
\ No newline at end of file
+            return "I'm sorry, I encountered an error while processing your request. Please try again or contact support for assistance.", 0.0
\ No newline at end of file
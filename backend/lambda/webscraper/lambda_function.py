@@ -6,43 +6,204 @@ Scrapes website content and saves to S3 for knowledge base ingestion
 
 import json
 import boto3
+from boto3.s3.transfer import TransferConfig
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
 import re
 import hashlib
-from urllib.parse import urljoin, urlparse, parse_qs
+from urllib.parse import urljoin, urlsplit, parse_qs
+from functools import lru_cache
 from collections import deque
 from datetime import datetime
 import logging
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from xml.etree import ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from lxml import etree
 from pypdf import PdfReader
 import io
+import os
+import math
+from botocore.config import Config
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Streaming upload settings
+MULTIPART_CHUNK_SIZE = 8 * 1024 * 1024  # S3 multipart threshold and part size
+
+# I/O-bound work (file downloads) may run this many times max_workers in parallel
+IO_CONCURRENCY_FACTOR = 4
+
+# Sitemap XML namespace
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+# C-backed parser; the full DOM is kept since text extraction needs it
+HTML_PARSER = 'lxml'
+
+# Bedrock metadata (document_type, document_category) by file extension
+DOCUMENT_TYPES = {
+    'txt': ("webpage", "web_content"),
+    'pdf': ("document", "pdf_document"),
+    'doc': ("document", "word_document"),
+    'docx': ("document", "word_document"),
+    'xls': ("spreadsheet", "excel_document"),
+    'xlsx': ("spreadsheet", "excel_document"),
+    'ppt': ("presentation", "powerpoint_document"),
+    'pptx': ("presentation", "powerpoint_document"),
+}
+DEFAULT_DOCUMENT_TYPE = ("file", "other_document")
+
+# Filename keywords mapped to page_type, checked in order
+PAGE_TYPE_KEYWORDS = (
+    ('index', "homepage"),
+    ('about', "about"),
+    ('contact', "contact"),
+)
+
+# Tags scanned for page links and embedded files
+LINK_TAGS = frozenset(['a', 'link', 'area'])
+EMBED_TAGS = frozenset(['embed', 'object', 'iframe'])
+
+# Link schemes that are never crawlable pages
+EXCLUDED_URL_SCHEMES = ('mailto:', 'tel:', 'javascript:', 'data:')
+
+# Scrape completion markers polled by scripts/invoke_webscraper.py. They go to a
+# separate status bucket so knowledge base syncs never see them.
+SCRAPE_STATUS_BUCKET = os.environ.get('SCRAPE_STATUS_BUCKET')
+COMPLETION_MARKER_PREFIX = '_done/'
+
+# Dispatcher fan-out: batches larger than this are split into ~sqrt(N) groups,
+# each handed to a child dispatcher, so no invocation starts more than ~sqrt(N)
+DISPATCH_DIRECT_LIMIT = 32
+DISPATCH_MAX_WORKERS = 16
+
+# Time the dispatcher keeps back to write failure markers before its Lambda timeout
+DISPATCH_TIME_RESERVE_MS = 10_000
+
+# Dispatch and status clients retry throttling inside botocore
+AWS_RETRY_CONFIG = Config(retries={'max_attempts': 5, 'mode': 'adaptive'})
+
+# Characters not allowed in S3 filenames
+UNSAFE_FILENAME_CHARS = re.compile(r'[<>:"/\\|?*]')
+WHITESPACE_RUN = re.compile(r'\s+')
+
+@lru_cache(maxsize=8192)
+def parse_url(url):
+    """Cached urlsplit - the same URL is parsed by several checks per page.
+    
+    urlsplit skips the ;params split that urlparse does; nothing here uses it.
+    """
+    return urlsplit(url)
+
+@lru_cache(maxsize=4096)
+def url_hash(url):
+    """Cached short MD5 hash of a URL."""
+    return hashlib.md5(url.encode()).hexdigest()[:8]
+
+@lru_cache(maxsize=1)
+def get_lambda_client():
+    """Lambda client for dispatching child scrapes, shared across warm invocations."""
+    return boto3.client('lambda', config=AWS_RETRY_CONFIG.merge(Config(max_pool_connections=DISPATCH_MAX_WORKERS)))
+
+@lru_cache(maxsize=1)
+def get_s3_client():
+    """S3 client for completion markers written outside a crawl, shared across warm invocations."""
+    return boto3.client('s3', config=AWS_RETRY_CONFIG)
+
+def completion_marker_key(base_url):
+    """S3 key of the completion marker for a scrape of base_url.
+    
+    Contract with scripts/invoke_webscraper.py completion_marker_key, which
+    can't import this module: _done/ + first 8 hex chars of md5(base_url).
+    Kept independent of url_hash so filename changes can't break polling.
+    """
+    return f"{COMPLETION_MARKER_PREFIX}{hashlib.md5(base_url.encode()).hexdigest()[:8]}.json"
+
+def write_completion_marker(s3_client, base_url, result):
+    """Record a finished scrape so asynchronous callers can stop waiting."""
+    if not SCRAPE_STATUS_BUCKET:
+        logger.warning("SCRAPE_STATUS_BUCKET not set, skipping completion marker")
+        return
+    try:
+        s3_client.put_object(
+            Bucket=SCRAPE_STATUS_BUCKET,
+            Key=completion_marker_key(base_url),
+            Body=json.dumps(result),
+            ContentType='application/json'
+        )
+    except Exception as e:
+        logger.error(f"Error writing completion marker for {base_url}: {str(e)}")
+
+class StreamReader:
+    """Read-only file-like view of a streamed HTTP body that counts bytes read."""
+    
+    def __init__(self, raw):
+        self.raw = raw
+        self.raw.decode_content = True
+        self.bytes_read = 0
+    
+    def read(self, size=-1):
+        if size is None or size < 0:
+            data = self.raw.read()
+        else:
+            # Fill the requested size so multipart parts are not undersized
+            chunks = []
+            remaining = size
+            while remaining > 0:
+                chunk = self.raw.read(remaining)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                remaining -= len(chunk)
+            data = b''.join(chunks)
+        self.bytes_read += len(data)
+        return data
+
 class WebScraper:
     def __init__(self, base_url, s3_bucket, max_workers=4, max_pages=200, excluded_patterns=None, excluded_urls=None):
         self.base_url = base_url
-        self.domain = urlparse(base_url).netloc
+        self.domain = parse_url(base_url).netloc
+        
+        # Precomputed same-domain checks (bare domain, www. variant, subdomains)
+        bare_domain = self.domain.replace('www.', '', 1)
+        self.allowed_netlocs = frozenset({self.domain, f"www.{bare_domain}", bare_domain})
+        self.allowed_suffix = f".{bare_domain}"
         self.s3_bucket = s3_bucket
         self.max_workers = max_workers
         self.max_pages = max_pages
         self.logger = logger
         
-        # Initialize S3 client
-        self.s3_client = boto3.client('s3')
+        # Same date stamp for every object written during this crawl
+        self.crawl_date = datetime.now().strftime('%Y-%m-%d')
+        
+        # Initialize S3 client. Each crawl thread may run an upload with max_workers
+        # part threads, so size the pool for that fan-out instead of botocore's 10.
+        self.s3_client = boto3.client('s3', config=Config(
+            max_pool_connections=max_workers * IO_CONCURRENCY_FACTOR * max_workers
+        ))
         
-        # Track visited URLs and downloaded files
+        # Multipart settings for streamed file uploads (parallel part PUTs)
+        self.transfer_config = TransferConfig(
+            multipart_threshold=MULTIPART_CHUNK_SIZE,
+            multipart_chunksize=MULTIPART_CHUNK_SIZE,
+            max_concurrency=max_workers,
+            use_threads=True
+        )
+        
+        # Track visited URLs and downloaded files. visited_urls is only touched
+        # by the crawl_website dispatcher thread, so it needs no lock.
         self.visited_urls = set()
         self.downloaded_files = set()
         
         # Thread-safe locks
-        self.visited_lock = threading.Lock()
         self.downloaded_lock = threading.Lock()
+        self.existing_keys_lock = threading.Lock()
+        
+        # Keys already in the bucket, loaded once per crawl (None = not loaded yet)
+        self.existing_keys = None
         
         # File extensions to download
         self.downloadable_extensions = {
@@ -55,6 +216,10 @@ class WebScraper:
             '.css', '.js', '.ico', '.png', '.jpg', '.jpeg', '.gif',
             '.woff', '.woff2', '.ttf', '.eot', '.map', '.json'
         }
+        
+        # Tuple forms so str.endswith can test all suffixes in one call
+        self.downloadable_suffixes = tuple(self.downloadable_extensions)
+        self.excluded_suffixes = tuple(self.excluded_extensions)
 
         # URL patterns to exclude
         self.excluded_url_patterns = [
@@ -78,26 +243,43 @@ class WebScraper:
         if excluded_patterns:
             self.excluded_url_patterns.extend(excluded_patterns)
         
+        # Single compiled alternation so each URL is scanned once
+        self.excluded_url_regex = re.compile(
+            '|'.join(f'(?:{pattern})' for pattern in self.excluded_url_patterns),
+            re.IGNORECASE
+        )
+        
         # Specific URLs to exclude
         self.excluded_urls = set(excluded_urls or [])
+        
+        # Shared HTTP session so keep-alive connections are reused across threads
+        self.session = self.create_session()
     
     def create_session(self):
-        """Create a new session for each thread."""
+        """Create a pooled session shared by all worker threads."""
         session = requests.Session()
         session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        adapter = HTTPAdapter(
+            pool_connections=self.max_workers,
+            pool_maxsize=self.max_workers * IO_CONCURRENCY_FACTOR,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
         return session
     
     def is_feed_or_dynamic_url(self, url):
         """Check if URL is a feed or dynamic content endpoint that should be excluded."""
-        for pattern in self.excluded_url_patterns:
-            if re.search(pattern, url, re.IGNORECASE):
-                logger.debug(f"Excluding feed/dynamic URL: {url} (matched pattern: {pattern})")
-                return True
+        if self.excluded_url_regex.search(url):
+            if logger.isEnabledFor(logging.DEBUG):
+                pattern = next(p for p in self.excluded_url_patterns if re.search(p, url, re.IGNORECASE))
+                logger.debug("Excluding feed/dynamic URL: %s (matched pattern: %s)", url, pattern)
+            return True
         
         # Additional check for complex query parameters
-        parsed = urlparse(url)
+        parsed = parse_url(url)
         if parsed.query:
             query_params = parse_qs(parsed.query)
             
@@ -108,7 +290,7 @@ class WebScraper:
                         '%7B' in value or
                         '%5B' in value or
                         value.count('%') > 10):
-                        logger.debug(f"Excluding complex parameter URL: {url}")
+                        logger.debug("Excluding complex parameter URL: %s", url)
                         return True
         
         return False
@@ -118,28 +300,27 @@ class WebScraper:
         try:
             # Check if URL is in excluded URLs list
             if url in self.excluded_urls:
-                logger.debug(f"Excluding specific URL: {url}")
+                logger.debug("Excluding specific URL: %s", url)
                 return False
                 
             if self.is_feed_or_dynamic_url(url):
                 return False
             
-            parsed = urlparse(url)
+            parsed = parse_url(url)
             
             # Domain checking
-            is_same_domain = (
-                parsed.netloc == self.domain or 
-                parsed.netloc == f"www.{self.domain}" or
-                parsed.netloc == self.domain.replace('www.', '') or
-                parsed.netloc.endswith(f".{self.domain.replace('www.', '')}")
-            )
+            netloc = parsed.netloc
+            is_same_domain = netloc in self.allowed_netlocs or netloc.endswith(self.allowed_suffix)
             
             is_valid_scheme = parsed.scheme in ['http', 'https']
             
             # Exclude problematic URLs
-            is_excluded = any(exclude in url.lower() for exclude in [
-                'mailto:', 'tel:', 'javascript:', '#', 'void(0)', 'data:'
-            ])
+            url_lower = url.lower()
+            is_excluded = (
+                url_lower.startswith(EXCLUDED_URL_SCHEMES) or
+                '#' in url_lower or
+                'void(0)' in url_lower
+            )
             
             # Allow relative URLs and same-domain URLs
             is_relative = not parsed.netloc or is_same_domain
@@ -147,22 +328,22 @@ class WebScraper:
             return (is_valid_scheme or not parsed.scheme) and is_relative and not is_excluded
             
         except Exception as e:
-            logger.debug(f"URL validation error for {url}: {str(e)}")
+            logger.debug("URL validation error for %s: %s", url, e)
             return False
     
     def sanitize_filename(self, filename):
         """Sanitize filename for safe storage."""
-        filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
+        filename = UNSAFE_FILENAME_CHARS.sub('_', filename)
         filename = filename.strip('. ')
         return filename[:200]  # Limit length
     
     def get_url_hash(self, url):
         """Generate a short hash for the URL to use in filenames."""
-        return hashlib.md5(url.encode()).hexdigest()[:8]
+        return url_hash(url)
     
     def get_domain_prefix(self, url):
         """Extract short domain prefix."""
-        domain = urlparse(url).netloc
+        domain = parse_url(url).netloc
         if domain.startswith('www.'):
             return 'main'
         elif '.' in domain:
@@ -175,35 +356,17 @@ class WebScraper:
         
         # Determine document type
         file_ext = filename.split('.')[-1].lower() if '.' in filename else ''
-        if file_ext == 'txt':
-            doc_type = "webpage"
-            doc_category = "web_content"
-        elif file_ext == 'pdf':
-            doc_type = "document"
-            doc_category = "pdf_document"
-        elif file_ext in ['doc', 'docx']:
-            doc_type = "document"
-            doc_category = "word_document"
-        elif file_ext in ['xls', 'xlsx']:
-            doc_type = "spreadsheet"
-            doc_category = "excel_document"
-        elif file_ext in ['ppt', 'pptx']:
-            doc_type = "presentation"
-            doc_category = "powerpoint_document"
-        else:
-            doc_type = "file"
-            doc_category = "other_document"
+        doc_type, doc_category = DOCUMENT_TYPES.get(file_ext, DEFAULT_DOCUMENT_TYPE)
         
         # Determine page type
         filename_lower = filename.lower()
-        if 'index' in filename_lower or filename_lower.startswith('home'):
+        if filename_lower.startswith('home'):
             page_type = "homepage"
-        elif 'about' in filename_lower:
-            page_type = "about"
-        elif 'contact' in filename_lower:
-            page_type = "contact"
         else:
-            page_type = "content"
+            page_type = next(
+                (value for keyword, value in PAGE_TYPE_KEYWORDS if keyword in filename_lower),
+                "content"
+            )
         
         # Create AWS Bedrock compatible metadata
         metadata = {
@@ -215,9 +378,9 @@ class WebScraper:
                 "document_category": doc_category,
                 "page_type": page_type,
                 "file_extension": f".{file_ext}",
-                "last_modified": datetime.now().strftime('%Y-%m-%d'),
+                "last_modified": self.crawl_date,
                 "content_type": content_type,
-                "domain": urlparse(source_webpage_url or original_url).netloc,
+                "domain": parse_url(source_webpage_url or original_url).netloc,
             }
         }
         
@@ -227,32 +390,93 @@ class WebScraper:
         
         return metadata
     
-    def upload_to_s3(self, content, s3_key, content_type='application/octet-stream'):
-        """Upload content directly to S3 bucket root."""
+    def create_source_user_metadata(self, original_url, source_webpage_url=None):
+        """Create S3 user metadata (x-amz-meta-*) recording where an object came from."""
+        user_metadata = {
+            "source": source_webpage_url or original_url,
+            "file_url": original_url,
+        }
+        # S3 user metadata values must be ASCII
+        return {key: value for key, value in user_metadata.items() if value.isascii()}
+    
+    def upload_to_s3(self, content, s3_key, content_type='application/octet-stream', user_metadata=None):
+        """Upload content (bytes, str or file-like object) directly to S3 bucket root."""
         try:
-            if isinstance(content, str):
-                content = content.encode('utf-8')
-            
-            self.s3_client.put_object(
-                Bucket=self.s3_bucket,
-                Key=s3_key,
-                Body=content,
-                ContentType=content_type
-            )
+            if hasattr(content, 'read'):
+                # File-like objects are streamed (multipart for large bodies)
+                extra_args = {'ContentType': content_type}
+                if user_metadata:
+                    extra_args['Metadata'] = user_metadata
+                
+                self.s3_client.upload_fileobj(
+                    content,
+                    self.s3_bucket,
+                    s3_key,
+                    ExtraArgs=extra_args,
+                    Config=self.transfer_config
+                )
+            else:
+                if isinstance(content, str):
+                    content = content.encode('utf-8')
+                
+                self.s3_client.put_object(
+                    Bucket=self.s3_bucket,
+                    Key=s3_key,
+                    Body=content,
+                    ContentType=content_type,
+                    Metadata=user_metadata or {}
+                )
+            if self.existing_keys is not None:
+                with self.existing_keys_lock:
+                    self.existing_keys.add(s3_key)
             logger.info(f"Uploaded to S3: s3://{self.s3_bucket}/{s3_key}")
             return True
         except Exception as e:
             logger.error(f"Failed to upload to S3: {str(e)}")
             return False
     
+    def load_existing_keys(self):
+        """List the bucket once so existence checks don't need a HEAD per key."""
+        try:
+            existing_keys = set()
+            paginator = self.s3_client.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=self.s3_bucket):
+                existing_keys.update(obj['Key'] for obj in page.get('Contents', []))
+            self.existing_keys = existing_keys
+            logger.info(f"Found {len(existing_keys)} existing objects in s3://{self.s3_bucket}")
+        except Exception as e:
+            logger.warning(f"Could not list bucket, falling back to per-key checks: {str(e)}")
+            self.existing_keys = None
+    
     def s3_file_exists(self, s3_key):
         """Check if file already exists in S3."""
+        if self.existing_keys is not None:
+            return s3_key in self.existing_keys
+        
         try:
             self.s3_client.head_object(Bucket=self.s3_bucket, Key=s3_key)
             return True
         except:
             return False
     
+    def get_source_attributes(self, s3_key, metadata_filename):
+        """Get the source/file_url recorded for an existing object."""
+        try:
+            # User metadata comes back on a HEAD, no body download needed
+            response = self.s3_client.head_object(Bucket=self.s3_bucket, Key=s3_key)
+            user_metadata = response.get('Metadata', {})
+            if 'source' in user_metadata:
+                return user_metadata
+        except Exception:
+            pass
+        
+        # Objects uploaded before user metadata was recorded only have the sidecar
+        metadata_content = self.download_from_s3(metadata_filename)
+        if metadata_content:
+            metadata = json.loads(metadata_content.decode('utf-8'))
+            return metadata.get('metadataAttributes', {})
+        return {}
+    
     def download_from_s3(self, s3_key):
         """Download file content from S3."""
         try:
@@ -262,24 +486,104 @@ class WebScraper:
             return None
     
     def get_s3_filename(self, url, filename, source_url=None):
-        """Generate S3 filename with domain prefix."""
+        """Generate deterministic S3 filename with domain prefix and URL hash."""
         domain_prefix = self.get_domain_prefix(url)
         safe_filename = self.sanitize_filename(filename)
-        return f"{domain_prefix}_{safe_filename}"
+        # Hash goes before the extension so Bedrock still sees the file type
+        name, ext = os.path.splitext(safe_filename)
+        return f"{domain_prefix}_{name}_{self.get_url_hash(url)}{ext}"
+    
+    def get_webpage_filename(self, url):
+        """Generate deterministic S3 filename for a crawled webpage."""
+        parsed_url = parse_url(url)
+        path_parts = [part for part in parsed_url.path.split('/') if part]
+        
+        domain_prefix = self.get_domain_prefix(url)
+        
+        if path_parts:
+            filename = f"{domain_prefix}_{'_'.join(path_parts)}"
+        else:
+            filename = f"{domain_prefix}_index"
+        
+        # URL hash keeps pages differing only by query string apart
+        return f"{self.sanitize_filename(filename)}_{self.get_url_hash(url)}.txt"
+    
+    def probe_legacy_keys(self, name, ext):
+        """Existing keys from the old naming scheme: name+ext, then name_1+ext, name_2+ext, ...
+
+        The old scheme probed those suffixes in order until one was free.
+        """
+        key = f"{name}{ext}"
+        counter = 1
+        while self.s3_file_exists(key):
+            yield key
+            key = f"{name}_{counter}{ext}"
+            counter += 1
+    
+    def legacy_file_keys(self, url, filename):
+        """Keys a downloaded file may have been stored under before URL-hash keys."""
+        domain_prefix = self.get_domain_prefix(url)
+        name, ext = os.path.splitext(filename)
+        yield from self.probe_legacy_keys(f"{domain_prefix}_{name}", ext)
+        if name == 'file':
+            # Nameless downloads were file_<hash>, briefly with the hash appended twice
+            file_hash = self.get_url_hash(url)
+            yield from self.probe_legacy_keys(f"{domain_prefix}_file_{file_hash}", ext)
+            doubled = f"{domain_prefix}_file_{file_hash}_{file_hash}{ext}"
+            if self.s3_file_exists(doubled):
+                yield doubled
+    
+    def legacy_webpage_keys(self, url):
+        """Keys a webpage may have been stored under before URL-hash keys."""
+        parsed_url = parse_url(url)
+        path_parts = [part for part in parsed_url.path.split('/') if part]
+        
+        domain_prefix = self.get_domain_prefix(url)
+        
+        if path_parts:
+            filename = f"{domain_prefix}_{'_'.join(path_parts)}"
+        else:
+            filename = f"{domain_prefix}_index"
+        
+        if parsed_url.query:
+            filename += f"_query_{self.get_url_hash(parsed_url.query)}"
+        
+        return self.probe_legacy_keys(self.sanitize_filename(filename), '.txt')
+    
+    def remove_legacy_objects(self, url, legacy_keys, current_key):
+        """Delete old-scheme copies of url (and their metadata) so syncs don't index duplicates."""
+        stale = []
+        for key in legacy_keys:
+            if key == current_key or key.endswith('.metadata.json'):
+                continue
+            # Old names could collide across URLs, so only delete objects recorded for this one
+            meta_attrs = self.get_source_attributes(key, f"{key}.metadata.json")
+            if meta_attrs.get('file_url') == url or meta_attrs.get('source') == url:
+                stale.extend((key, f"{key}.metadata.json"))
+        
+        if not stale:
+            return
+        try:
+            self.s3_client.delete_objects(
+                Bucket=self.s3_bucket,
+                Delete={'Objects': [{'Key': key} for key in stale], 'Quiet': True}
+            )
+            if self.existing_keys is not None:
+                with self.existing_keys_lock:
+                    self.existing_keys.difference_update(stale)
+            logger.info(f"Removed old-scheme objects for {url}: {stale}")
+        except Exception as e:
+            logger.error(f"Failed to remove old-scheme objects for {url}: {str(e)}")
     
     def extract_text_content(self, soup):
         """Extract readable text content from BeautifulSoup object."""
         # Remove script and style elements
-        for script in soup(["script", "style", "nav", "footer", "header"]):
-            script.decompose()
-        
-        # Get text and clean it up
-        text = soup.get_text()
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
+        for element in soup.find_all(["script", "style", "nav", "footer", "header"]):
+            element.decompose()
         
-        return text
+        # Get text and collapse whitespace in a single pass
+        text = soup.get_text(separator=' ', strip=True)
+        return WHITESPACE_RUN.sub(' ', text)
     
     def file_already_exists(self, url, filename):
         """Check if file already exists to avoid re-downloading."""
@@ -289,14 +593,11 @@ class WebScraper:
         if self.s3_file_exists(s3_filename) and self.s3_file_exists(metadata_filename):
             try:
                 # Check if metadata contains the same file URL
-                metadata_content = self.download_from_s3(metadata_filename)
-                if metadata_content:
-                    metadata = json.loads(metadata_content.decode('utf-8'))
-                    meta_attrs = metadata.get('metadataAttributes', {})
-                    if (meta_attrs.get('file_url') == url or 
-                        meta_attrs.get('source') == url):
-                        logger.info(f"File already exists, skipping: {filename}")
-                        return True
+                meta_attrs = self.get_source_attributes(s3_filename, metadata_filename)
+                if (meta_attrs.get('file_url') == url or 
+                    meta_attrs.get('source') == url):
+                    logger.info(f"File already exists, skipping: {filename}")
+                    return True
             except Exception:
                 pass
         return False
@@ -304,50 +605,53 @@ class WebScraper:
     def download_file(self, url, source_url):
         """Download a file and save to S3 with metadata."""
         try:
-            session = self.create_session()
             logger.info(f"Downloading file: {url}")
-            response = session.get(url, timeout=30)
-            response.raise_for_status()
-            
-            # Get filename from URL or Content-Disposition header
-            filename = None
-            if 'Content-Disposition' in response.headers:
-                cd = response.headers['Content-Disposition']
-                filename_match = re.search(r'filename="?([^"]+)"?', cd)
-                if filename_match:
-                    filename = filename_match.group(1)
-            
-            if not filename:
-                filename = urlparse(url).path.split('/')[-1]
-                if not filename or '.' not in filename:
-                    content_type = response.headers.get('content-type', '').lower()
-                    if 'pdf' in content_type:
-                        ext = '.pdf'
-                    else:
-                        ext = '.bin'
-                    filename = f"file_{self.get_url_hash(url)}{ext}"
-            
-            filename = self.sanitize_filename(filename)
-            
-            # Check if file already exists
-            if self.file_already_exists(url, filename):
-                with self.downloaded_lock:
-                    self.downloaded_files.add(url)
-                return True
-            
-            # Ensure unique filename
-            counter = 1
-            original_filename = filename
-            s3_filename = self.get_s3_filename(url, filename)
-            while self.s3_file_exists(s3_filename):
-                name, ext = original_filename.rsplit('.', 1) if '.' in original_filename else (original_filename, '')
-                filename = f"{name}_{counter}.{ext}" if ext else f"{name}_{counter}"
+            with self.session.get(url, timeout=30, stream=True) as response:
+                response.raise_for_status()
+                
+                # Get filename from URL or Content-Disposition header
+                filename = None
+                if 'Content-Disposition' in response.headers:
+                    cd = response.headers['Content-Disposition']
+                    filename_match = re.search(r'filename="?([^"]+)"?', cd)
+                    if filename_match:
+                        filename = filename_match.group(1)
+                
+                if not filename:
+                    filename = parse_url(url).path.split('/')[-1]
+                    if not filename or '.' not in filename:
+                        content_type = response.headers.get('content-type', '').lower()
+                        if 'pdf' in content_type:
+                            ext = '.pdf'
+                        else:
+                            ext = '.bin'
+                        # get_s3_filename appends the URL hash, which keeps this unique
+                        filename = f"file{ext}"
+                
+                filename = self.sanitize_filename(filename)
+                
+                # One deterministic key per URL, so no uniqueness probing is needed
                 s3_filename = self.get_s3_filename(url, filename)
-                counter += 1
+                
+                # Check if file already exists (before reading the body)
+                if self.file_already_exists(url, filename):
+                    self.remove_legacy_objects(url, self.legacy_file_keys(url, filename), s3_filename)
+                    with self.downloaded_lock:
+                        self.downloaded_files.add(url)
+                    return True
+                
+                content_type = response.headers.get('content-type', 'application/octet-stream')
+                
+                # Upload file to S3 straight from the HTTP stream, so multipart
+                # part uploads overlap with the rest of the download
+                body = StreamReader(response.raw)
+                uploaded = self.upload_to_s3(
+                    body, s3_filename, content_type,
+                    user_metadata=self.create_source_user_metadata(url, source_url)
+                )
+                file_size = body.bytes_read
             
-            # Upload file to S3
-            content_type = response.headers.get('content-type', 'application/octet-stream')
-            if self.upload_to_s3(response.content, s3_filename, content_type):
+            if uploaded:
                 
                 # Create and upload metadata
                 metadata = self.create_bedrock_metadata(
@@ -355,13 +659,14 @@ class WebScraper:
                     filename=filename,
                     title=filename,
                     content_type=content_type,
-                    file_size=len(response.content),
+                    file_size=file_size,
                     source_webpage_url=source_url
                 )
                 
                 metadata_json = json.dumps(metadata, indent=2, ensure_ascii=False)
                 metadata_filename = f"{s3_filename}.metadata.json"
                 self.upload_to_s3(metadata_json, metadata_filename, 'application/json')
+                self.remove_legacy_objects(url, self.legacy_file_keys(url, filename), s3_filename)
                 
                 with self.downloaded_lock:
                     self.downloaded_files.add(url)
@@ -376,31 +681,15 @@ class WebScraper:
     
     def webpage_already_exists(self, url):
         """Check if webpage already exists to avoid re-processing."""
-        # Create potential filename
-        parsed_url = urlparse(url)
-        path_parts = [part for part in parsed_url.path.split('/') if part]
-        
-        domain_prefix = self.get_domain_prefix(url)
-        
-        if path_parts:
-            filename = f"{domain_prefix}_{'_'.join(path_parts)}"
-        else:
-            filename = f"{domain_prefix}_index"
-        
-        if parsed_url.query:
-            filename += f"_query_{self.get_url_hash(parsed_url.query)}"
-        
-        filename = self.sanitize_filename(filename) + '.txt'
+        filename = self.get_webpage_filename(url)
         metadata_filename = f"{filename}.metadata.json"
         
         if self.s3_file_exists(filename) and self.s3_file_exists(metadata_filename):
             try:
-                metadata_content = self.download_from_s3(metadata_filename)
-                if metadata_content:
-                    metadata = json.loads(metadata_content.decode('utf-8'))
-                    if metadata.get('metadataAttributes', {}).get('source') == url:
-                        logger.info(f"Webpage already exists, skipping: {filename}")
-                        return True
+                meta_attrs = self.get_source_attributes(filename, metadata_filename)
+                if meta_attrs.get('source') == url:
+                    logger.info(f"Webpage already exists, skipping: {filename}")
+                    return True
             except Exception:
                 pass
         return False
@@ -408,34 +697,14 @@ class WebScraper:
     def save_webpage(self, url, soup, response_content):
         """Save webpage content as text file to S3 with metadata."""
         try:
+            # Create filename based on URL (one key per URL, overwritten on re-runs)
+            filename = self.get_webpage_filename(url)
+            
             # Check if webpage already exists
             if self.webpage_already_exists(url):
+                self.remove_legacy_objects(url, self.legacy_webpage_keys(url), filename)
                 return True
             
-            # Create filename based on URL
-            parsed_url = urlparse(url)
-            path_parts = [part for part in parsed_url.path.split('/') if part]
-            
-            domain_prefix = self.get_domain_prefix(url)
-            
-            if path_parts:
-                filename = f"{domain_prefix}_{'_'.join(path_parts)}"
-            else:
-                filename = f"{domain_prefix}_index"
-            
-            if parsed_url.query:
-                filename += f"_query_{self.get_url_hash(parsed_url.query)}"
-            
-            filename = self.sanitize_filename(filename) + '.txt'
-            
-            # Ensure unique filename
-            counter = 1
-            original_filename = filename
-            while self.s3_file_exists(filename):
-                name = original_filename.replace('.txt', '')
-                filename = f"{name}_{counter}.txt"
-                counter += 1
-            
             # Extract and prepare text content
             text_content = self.extract_text_content(soup)
             title = soup.title.string if soup.title else filename
@@ -444,7 +713,8 @@ class WebScraper:
             full_content = f"URL: {url}\nTitle: {title}\n{'=' * 50}\n\n{text_content}"
             
             # Upload webpage to S3
-            if self.upload_to_s3(full_content, filename, 'text/plain'):
+            if self.upload_to_s3(full_content, filename, 'text/plain',
+                                 user_metadata=self.create_source_user_metadata(url, url)):
                 
                 # Create and upload metadata
                 metadata = self.create_bedrock_metadata(
@@ -459,6 +729,7 @@ class WebScraper:
                 metadata_json = json.dumps(metadata, indent=2, ensure_ascii=False)
                 metadata_filename = f"{filename}.metadata.json"
                 self.upload_to_s3(metadata_json, metadata_filename, 'application/json')
+                self.remove_legacy_objects(url, self.legacy_webpage_keys(url), filename)
                 
                 logger.info(f"Saved webpage to S3: {filename}")
                 return True
@@ -473,55 +744,78 @@ class WebScraper:
         links = set()
         files = set()
         
-        # Find all links in ALL tags
-        for tag in soup.find_all(['a', 'link', 'area']):
-            href = tag.get('href')
-            if href:
-                full_url = urljoin(base_url, href)
-                
-                # Check if it's a downloadable file
-                parsed = urlparse(full_url)
-                path_lower = parsed.path.lower()
-                
-                is_downloadable = any(path_lower.endswith(ext) for ext in self.downloadable_extensions)
-                is_excluded = any(path_lower.endswith(ext) for ext in self.excluded_extensions)
-                
-                is_file = is_downloadable and not is_excluded
-                
-                if is_file:
-                    files.add(full_url)
-                elif self.is_valid_url(full_url):
-                    # Don't crawl excluded file types as webpages
-                    is_excluded_type = any(path_lower.endswith(ext) for ext in self.excluded_extensions)
-                    if not is_excluded_type:
+        # Walk the DOM once and dispatch on tag name
+        for tag in soup.find_all(True):
+            name = tag.name
+            
+            # Find all links in ALL tags
+            if name in LINK_TAGS:
+                href = tag.get('href')
+                if href:
+                    full_url = urljoin(base_url, href)
+                    
+                    # Check if it's a downloadable file
+                    parsed = parse_url(full_url)
+                    path_lower = parsed.path.lower()
+                    
+                    is_downloadable = path_lower.endswith(self.downloadable_suffixes)
+                    is_excluded = path_lower.endswith(self.excluded_suffixes)
+                    
+                    if is_downloadable and not is_excluded:
+                        files.add(full_url)
+                    elif not is_excluded and self.is_valid_url(full_url):
+                        # Don't crawl excluded file types as webpages
                         links.add(full_url)
-        
-        # Also check for files in other tags
-        for tag in soup.find_all(['embed', 'object', 'iframe']):
-            src = tag.get('src') or tag.get('data')
-            if src:
-                full_url = urljoin(base_url, src)
-                parsed = urlparse(full_url)
-                path_lower = parsed.path.lower()
-                
-                is_downloadable = any(path_lower.endswith(ext) for ext in self.downloadable_extensions)
-                is_excluded = any(path_lower.endswith(ext) for ext in self.excluded_extensions)
-                
-                if is_downloadable and not is_excluded:
-                    files.add(full_url)
-        
-        # Look for data attributes that might contain URLs
-        for tag in soup.find_all(attrs={'data-href': True}):
+            
+            # Also check for files in other tags
+            elif name in EMBED_TAGS:
+                src = tag.get('src') or tag.get('data')
+                if src:
+                    full_url = urljoin(base_url, src)
+                    parsed = parse_url(full_url)
+                    path_lower = parsed.path.lower()
+                    
+                    is_downloadable = path_lower.endswith(self.downloadable_suffixes)
+                    is_excluded = path_lower.endswith(self.excluded_suffixes)
+                    
+                    if is_downloadable and not is_excluded:
+                        files.add(full_url)
+            
+            # Look for data attributes that might contain URLs
             href = tag.get('data-href')
             if href:
                 full_url = urljoin(base_url, href)
                 if self.is_valid_url(full_url):
                     links.add(full_url)
         
-        logger.debug(f"Found {len(links)} links and {len(files)} files on {base_url}")
+        logger.debug("Found %d links and %d files on %s", len(links), len(files), base_url)
         
         return links, files
     
+    def parse_sitemap(self, response):
+        """Stream-parse a sitemap response, returning (page URLs, sub-sitemap URLs)."""
+        page_urls = set()
+        sub_sitemaps = []
+        
+        response.raw.decode_content = True
+        for _, elem in etree.iterparse(response.raw, tag=f'{{{SITEMAP_NS}}}loc'):
+            parent = elem.getparent()
+            if elem.text and parent is not None:
+                url = elem.text.strip()
+                if parent.tag == f'{{{SITEMAP_NS}}}url':
+                    if self.is_valid_url(url):
+                        page_urls.add(url)
+                elif parent.tag == f'{{{SITEMAP_NS}}}sitemap':
+                    sub_sitemaps.append(url)
+            
+            # Free parsed entries so memory stays flat on large sitemaps
+            elem.clear()
+            if parent is not None and parent.getparent() is not None:
+                while parent.getprevious() is not None:
+                    del parent.getparent()[0]
+        
+        return page_urls, sub_sitemaps
+    
     def fetch_sitemap_urls(self):
         """Fetch URLs from sitemap.xml if it exists."""
         sitemap_urls = set()
@@ -532,41 +826,33 @@ class WebScraper:
             sitemap_url = urljoin(self.base_url, sitemap_path)
             
             try:
-                session = self.create_session()
                 logger.info(f"Checking for sitemap: {sitemap_url}")
-                response = session.get(sitemap_url, timeout=30)
-                
-                if response.status_code == 200:
-                    logger.info(f"Found sitemap: {sitemap_url}")
+                with self.session.get(sitemap_url, timeout=30, stream=True) as response:
                     
-                    try:
-                        root = ET.fromstring(response.content)
-                        
-                        # Standard sitemap
-                        for url_elem in root.findall('.//{http://www.sitemaps.org/schemas/sitemap/0.9}url'):
-                            loc_elem = url_elem.find('{http://www.sitemaps.org/schemas/sitemap/0.9}loc')
-                            if loc_elem is not None and loc_elem.text:
-                                url = loc_elem.text.strip()
-                                if self.is_valid_url(url):
-                                    sitemap_urls.add(url)
+                    if response.status_code == 200:
+                        logger.info(f"Found sitemap: {sitemap_url}")
                         
-                        # Sitemap index
-                        for sitemap_elem in root.findall('.//{http://www.sitemaps.org/schemas/sitemap/0.9}sitemap'):
-                            loc_elem = sitemap_elem.find('{http://www.sitemaps.org/schemas/sitemap/0.9}loc')
-                            if loc_elem is not None and loc_elem.text:
-                                sub_sitemap_url = loc_elem.text.strip()
-                                sub_urls = self.fetch_sub_sitemap(sub_sitemap_url)
-                                sitemap_urls.update(sub_urls)
-                        
-                        logger.info(f"Found {len(sitemap_urls)} URLs in sitemap: {sitemap_url}")
-                        break
-                        
-                    except ET.ParseError as e:
-                        logger.warning(f"Could not parse sitemap XML {sitemap_url}: {str(e)}")
-                        continue
+                        try:
+                            page_urls, sub_sitemaps = self.parse_sitemap(response)
+                            
+                            # Standard sitemap
+                            sitemap_urls.update(page_urls)
+                            
+                            # Sitemap index - fetch sub-sitemaps in parallel
+                            if sub_sitemaps:
+                                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                                    for sub_urls in executor.map(self.fetch_sub_sitemap, sub_sitemaps):
+                                        sitemap_urls.update(sub_urls)
+                            
+                            logger.info(f"Found {len(sitemap_urls)} URLs in sitemap: {sitemap_url}")
+                            break
+                            
+                        except etree.XMLSyntaxError as e:
+                            logger.warning(f"Could not parse sitemap XML {sitemap_url}: {str(e)}")
+                            continue
                         
             except Exception as e:
-                logger.debug(f"Sitemap not found or error accessing {sitemap_url}: {str(e)}")
+                logger.debug("Sitemap not found or error accessing %s: %s", sitemap_url, e)
                 continue
         
         if sitemap_urls:
@@ -580,18 +866,11 @@ class WebScraper:
         """Fetch URLs from a sub-sitemap."""
         urls = set()
         try:
-            session = self.create_session()
-            response = session.get(sitemap_url, timeout=30)
-            
-            if response.status_code == 200:
-                root = ET.fromstring(response.content)
+            with self.session.get(sitemap_url, timeout=30, stream=True) as response:
                 
-                for url_elem in root.findall('.//{http://www.sitemaps.org/schemas/sitemap/0.9}url'):
-                    loc_elem = url_elem.find('{http://www.sitemaps.org/schemas/sitemap/0.9}loc')
-                    if loc_elem is not None and loc_elem.text:
-                        url = loc_elem.text.strip()
-                        if self.is_valid_url(url):
-                            urls.add(url)
+                if response.status_code == 200:
+                    page_urls, _ = self.parse_sitemap(response)
+                    urls.update(page_urls)
                             
         except Exception as e:
             logger.warning(f"Error fetching sub-sitemap {sitemap_url}: {str(e)}")
@@ -601,13 +880,12 @@ class WebScraper:
     def process_url(self, url):
         """Process a single URL - to be used with threading."""
         try:
-            session = self.create_session()
             logger.info(f"Crawling: {url}")
-            response = session.get(url, timeout=30, allow_redirects=True)
+            response = self.session.get(url, timeout=30, allow_redirects=True)
             response.raise_for_status()
             
             # Parse HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = BeautifulSoup(response.content, HTML_PARSER)
             
             # Save webpage to S3
             self.save_webpage(url, soup, response.content)
@@ -621,33 +899,13 @@ class WebScraper:
             logger.error(f"Error processing {url}: {str(e)}")
             return set(), set(), url
     
-    def download_files_threaded(self, file_urls_with_source):
-        """Download files using threading."""
-        if not file_urls_with_source:
-            return
-            
-        logger.info(f"Starting threaded download of {len(file_urls_with_source)} files...")
-        
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Submit download tasks
-            future_to_url = {
-                executor.submit(self.download_file, file_url, source_url): (file_url, source_url)
-                for file_url, source_url in file_urls_with_source
-                if file_url not in self.downloaded_files
-            }
-            
-            # Process completed downloads
-            for future in as_completed(future_to_url):
-                file_url, source_url = future_to_url[future]
-                try:
-                    future.result()
-                except Exception as e:
-                    logger.error(f"Download failed for {file_url}: {str(e)}")
-    
     def crawl_website(self):
         """Main crawling function with threading support."""
         logger.info(f"Starting to crawl: {self.base_url}")
         
+        # Cache the bucket listing up front for existence checks
+        self.load_existing_keys()
+        
         # Queue for URLs to visit - start with base URL and sitemap URLs
         url_queue = deque([self.base_url])
         
@@ -663,71 +921,166 @@ class WebScraper:
         pages_processed = 0
         total_links_found = 0
         
-        while url_queue and pages_processed < self.max_pages:
-            # Process URLs in batches
-            current_batch = []
-            batch_size = min(self.max_workers, len(url_queue))
-            
-            for _ in range(batch_size):
-                if url_queue:
+        # In-flight work: page futures and file download futures share one pool.
+        # Pages are capped at max_workers; the extra threads let downloads
+        # (pure network/S3 wait) overlap without starving page crawling.
+        page_futures = {}
+        download_futures = {}
+        queued_files = set()
+        
+        # Every URL ever enqueued, so the queue never holds duplicates
+        queued_urls = set(url_queue)
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers * IO_CONCURRENCY_FACTOR) as executor:
+            while True:
+                # Keep the page window saturated as soon as a slot frees up
+                while (url_queue and len(page_futures) < self.max_workers and
+                       pages_processed + len(page_futures) < self.max_pages):
                     url = url_queue.popleft()
-                    with self.visited_lock:
-                        if url not in self.visited_urls:
-                            current_batch.append(url)
-                            self.visited_urls.add(url)
-            
-            if not current_batch:
-                break
-            
-            # Process batch of URLs with threading
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                future_to_url = {
-                    executor.submit(self.process_url, url): url 
-                    for url in current_batch
-                }
+                    if url in self.visited_urls:
+                        continue
+                    self.visited_urls.add(url)
+                    page_futures[executor.submit(self.process_url, url)] = url
                 
-                batch_files = []
-                for future in as_completed(future_to_url):
-                    url = future_to_url[future]
+                if not page_futures and not download_futures:
+                    break
+                
+                done, _ = wait(set(page_futures) | set(download_futures), return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    if future in download_futures:
+                        file_url = download_futures.pop(future)
+                        try:
+                            future.result()
+                        except Exception as e:
+                            logger.error(f"Download failed for {file_url}: {str(e)}")
+                        continue
+                    
+                    url = page_futures.pop(future)
                     try:
                         links, files, processed_url = future.result()
                         pages_processed += 1
                         total_links_found += len(links)
                         
-                        # Add files to download list
+                        # Download files without waiting for other pages
                         for file_url in files:
-                            batch_files.append((file_url, processed_url))
+                            if file_url in queued_files or file_url in self.downloaded_files:
+                                continue
+                            queued_files.add(file_url)
+                            download_futures[executor.submit(self.download_file, file_url, processed_url)] = file_url
+                        
+                        # Add new links to queue (one set difference per page)
+                        new_links = links - queued_urls
+                        queued_urls.update(new_links)
+                        url_queue.extend(new_links)
                         
-                        # Add new links to queue
-                        new_links_added = 0
-                        for link in links:
-                            with self.visited_lock:
-                                if link not in self.visited_urls:
-                                    url_queue.append(link)
-                                    new_links_added += 1
+                        if new_links:
+                            logger.debug("Added %d new links from %s", len(new_links), processed_url)
                         
-                        if new_links_added > 0:
-                            logger.debug(f"Added {new_links_added} new links from {processed_url}")
+                        # Log progress periodically
+                        if pages_processed % 10 == 0:
+                            logger.info(f"Progress: {pages_processed} pages processed, {len(url_queue)} in queue, {total_links_found} total links found")
                                     
                     except Exception as e:
                         logger.error(f"Error processing results for {url}: {str(e)}")
-                
-                # Download files from this batch
-                if batch_files:
-                    self.download_files_threaded(batch_files)
-                
-                # Log progress periodically
-                if pages_processed % 10 == 0:
-                    logger.info(f"Progress: {pages_processed} pages processed, {len(url_queue)} in queue, {total_links_found} total links found")
         
         logger.info(f"Crawling completed. Visited {len(self.visited_urls)} pages, downloaded {len(self.downloaded_files)} files.")
 
+def fail_scrapes(urls, error, status_code=500):
+    """Write failed completion markers so callers stop waiting on scrapes that won't run."""
+    s3_client = get_s3_client()
+    for url in urls:
+        write_completion_marker(s3_client, url, {
+            'statusCode': status_code,
+            'base_url': url,
+            'error': error
+        })
+
+def dispatch_scrapes(event, context):
+    """Start an asynchronous scraper invocation per URL in event['urls']."""
+    urls = event.get('urls') or []
+    s3_bucket = event.get('s3_bucket')
+    
+    if not urls or not s3_bucket:
+        error = 'Missing required parameters: urls and s3_bucket'
+        fail_scrapes(urls, error, status_code=400)
+        return {
+            'statusCode': 400,
+            'error': error
+        }
+    
+    # URLs that already have a child invocation or a failure marker; anything else
+    # gets a failure marker if the dispatcher itself fails (it isn't retried)
+    settled = set()
+    settled_lock = threading.Lock()
+    
+    try:
+        # Children inherit every setting except the URL list and base URL. Serialize the
+        # shared settings once and splice each child's own key into the front of the object.
+        shared = json.dumps({key: value for key, value in event.items() if key not in ('urls', 'base_url')})
+        rest = f', {shared[1:]}' if len(shared) > 2 else '}'
+        if len(urls) > DISPATCH_DIRECT_LIMIT:
+            group_size = math.ceil(math.sqrt(len(urls)))
+            groups = [urls[i:i + group_size] for i in range(0, len(urls), group_size)]
+            payloads = [(group, f'{{"urls": {json.dumps(group)}{rest}') for group in groups]
+        else:
+            payloads = [([url], f'{{"base_url": {json.dumps(url)}{rest}') for url in urls]
+        
+        workers = min(len(payloads), DISPATCH_MAX_WORKERS)
+        # Resolve clients here: creating them on the default session isn't thread-safe
+        lambda_client = get_lambda_client()
+        get_s3_client()
+        
+        def invoke(payload):
+            payload_urls, body = payload
+            try:
+                # Stop before the Lambda timeout, which would leave no chance to report
+                if context.get_remaining_time_in_millis() < DISPATCH_TIME_RESERVE_MS:
+                    raise TimeoutError("dispatcher ran out of time")
+                lambda_client.invoke(
+                    FunctionName=context.invoked_function_arn,
+                    InvocationType='Event',
+                    Payload=body
+                )
+                return True
+            except Exception as e:
+                # Fail the affected sites now rather than leaving callers to time out
+                logger.error(f"Error dispatching scrape: {str(e)}")
+                fail_scrapes(payload_urls, f"Dispatch failed: {str(e)}")
+                return False
+            finally:
+                with settled_lock:
+                    settled.update(payload_urls)
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            dispatched = sum(executor.map(invoke, payloads))
+        
+    except Exception as e:
+        logger.error(f"Dispatcher error: {str(e)}")
+        fail_scrapes([url for url in urls if url not in settled], f"Dispatch failed: {str(e)}")
+        return {
+            'statusCode': 500,
+            'error': f'Error: {str(e)}'
+        }
+    
+    logger.info(f"Dispatched {dispatched}/{len(payloads)} invocations for {len(urls)} URLs")
+    return {
+        'statusCode': 200,
+        'message': 'Scrapes dispatched',
+        'urls': len(urls),
+        'invocations': len(payloads),
+        'dispatched': dispatched
+    }
+
 def lambda_handler(event, context):
     """Lambda function handler."""
+    if 'urls' in event:
+        return dispatch_scrapes(event, context)
+    
+    base_url = event.get('base_url')
+    s3_bucket = event.get('s3_bucket')
     try:
         # Get parameters from event
-        base_url = event.get('base_url')
-        s3_bucket = event.get('s3_bucket')
         max_workers = event.get('max_workers', 4)
         max_pages = event.get('max_pages', 200)
         excluded_patterns = event.get('excluded_patterns', [])
@@ -736,28 +1089,32 @@ def lambda_handler(event, context):
         if not base_url or not s3_bucket:
             return {
                 'statusCode': 400,
-                'body': json.dumps('Missing required parameters: base_url and s3_bucket')
+                'error': 'Missing required parameters: base_url and s3_bucket'
             }
         
         # Create scraper and start crawling
         scraper = WebScraper(base_url, s3_bucket, max_workers, max_pages, excluded_patterns, excluded_urls)
         scraper.crawl_website()
         
-        # Return results
-        return {
+        # The result is returned as-is (no JSON string body) and doubles as the completion marker
+        result = {
             'statusCode': 200,
-            'body': json.dumps({
-                'message': 'Scraping completed successfully',
-                'base_url': base_url,
-                'pages_crawled': len(scraper.visited_urls),
-                'files_downloaded': len(scraper.downloaded_files),
-                's3_bucket': s3_bucket
-            })
+            'message': 'Scraping completed successfully',
+            'base_url': base_url,
+            'pages_crawled': len(scraper.visited_urls),
+            'files_downloaded': len(scraper.downloaded_files),
+            's3_bucket': s3_bucket
         }
+        write_completion_marker(scraper.s3_client, base_url, result)
+        return result
         
     except Exception as e:
         logger.error(f"Lambda function error: {str(e)}")
-        return {
+        result = {
             'statusCode': 500,
-            'body': json.dumps(f'Error: {str(e)}')
-        }
\ No newline at end of file
+            'base_url': base_url,
+            'error': f'Error: {str(e)}'
+        }
+        if base_url:
+            write_completion_marker(get_s3_client(), base_url, result)
+        return result
@@ -2,154 +2,282 @@
 Configuration settings for Generic Chatbot CDK deployment
 """
 import os
-import yaml
-from pathlib import Path
+import copy
+import glob
+import time
+import pickle
+import functools
+import hashlib
+import tempfile
+
+# yaml is imported lazily so importing this module stays cheap
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.yaml")
+
+# Read buffer for config.yaml (and anything it grows to include)
+CONFIG_READ_BUFFER_SIZE = 64 * 1024
+
+# Environment variables that influence the loaded Config
+CONFIG_ENV_VARS = ("CDK_DEFAULT_REGION", "CDK_DEFAULT_ACCOUNT", "KNOWLEDGE_BASE_ID", "ENVIRONMENT")
+
+# Parsed Config instances are pickled here so later processes (e.g. repeated
+# cdk synth runs) can skip YAML parsing entirely
+CONFIG_PICKLE_DIR = tempfile.gettempdir()
+CONFIG_PICKLE_PREFIX = "chatbot_config_"
+CONFIG_PICKLE_MAX_AGE_DAYS = 7
+
+# Fallback values for every setting read from config.yaml
+_DEFAULTS = {
+    'aws': {'region': 'us-west-2', 'account': None},
+    'stack': {'name': 'ChatbotFrameworkStack'},
+    'chatbot': {
+        'use_classifier': False,
+        'models': {
+            'classifier': 'us.amazon.nova-lite-v1:0',
+            'rag': 'anthropic.claude-3-5-sonnet-20241022-v2:0',
+        },
+        'prompt': {
+            'system': 'You are a helpful assistant.',
+            'classifier': 'Classify this message as greeting, farewell, or knowledge_base: {user_input}',
+        },
+        'responses': {
+            'greeting': 'Hello! How can I help you today?',
+            'farewell': 'Thank you! Have a great day!',
+        },
+    },
+    'ui': {
+        'name': 'My AI Assistant',
+        'description': 'Get help with information and questions',
+        'welcome_message': 'Welcome! How can I help you today?',
+        'colors': {
+            'primary': '#1A2F71',
+            'secondary': '#48AEB2',
+            'background_gradient_start': '#1A2F71',
+            'background_gradient_end': '#48AEB2',
+        },
+    },
+    's3': {
+        'knowledge_base_bucket': 'my-existing-documents-bucket',
+        'frontend_bucket': 'chatbot-frontend',
+    },
+    'dynamodb': {'table_name': 'chatbot-conversations'},
+    'bedrock': {
+        'knowledge_base_id': None,
+        'knowledge_base_name': 'MyKnowledgeBase',
+        'embedding_model': 'amazon.titan-embed-text-v2:0',
+        'search': {'type': 'SEMANTIC', 'number_of_results': 10},
+        'chunking': {
+            'strategy': 'SEMANTIC',
+            'max_tokens': 300,
+            'buffer_size': 0,
+            'breakpoint_percentile_threshold': 95,
+        },
+    },
+    'opensearch': {
+        'domain_name': 'chatbot-kb',
+        'version': '2.3',
+        'instance_type': 't3.small.search',
+        'instance_count': 1,
+        'volume_size': 10,
+        'volume_type': 'gp3',
+        'index_name': 'chatbotindex',
+        'vector_field': 'vector',
+        'text_field': 'text',
+        'metadata_field': 'metadata',
+        'vector_dimension': 1024,
+        'space_type': 'l2',
+        'engine': 'FAISS',
+    },
+    'lambda': {
+        'timeout': 300,
+        'memory': 512,
+        'runtime': 'python3.13',
+        'chatbot': {'timeout': 300, 'memory': 1024},
+        'webscraper': {
+            'timeout': 900,
+            'memory': 1024,
+            'max_workers': 4,
+            'max_pages': 200,
+            'excluded_urls': [],
+            'websites_to_scrape': [],
+        },
+    },
+    'api': {
+        'name': 'ChatbotAPI',
+        'cors': {
+            'allow_origins': ['*'],
+            'allow_methods': ['GET', 'POST', 'OPTIONS'],
+            'allow_headers': ['Content-Type', 'Authorization'],
+        },
+    },
+    'cloudfront': {
+        'default_root_object': 'index.html',
+        'error_responses': [],
+        'caching': {'enabled': True},
+    },
+    'environments': {},
+}
+
+def _deep_merge(defaults, overrides):
+    """Return defaults with overrides applied, recursing into nested sections"""
+    # Deep copy so list/dict leaves of the result never alias _DEFAULTS
+    merged = copy.deepcopy(defaults)
+    for key, value in (overrides or {}).items():
+        default = merged.get(key)
+        if isinstance(default, dict) and isinstance(value, dict):
+            merged[key] = _deep_merge(default, value)
+        elif isinstance(default, dict) and value is None:
+            # Empty section in YAML (e.g. "ui:" with nothing under it)
+            continue
+        else:
+            merged[key] = value
+    return merged
+
+def parse_yaml(data):
+    """Parse YAML text or bytes"""
+    import yaml
+    # libyaml-backed loader when available, pure-Python otherwise
+    try:
+        from yaml import CSafeLoader as SafeLoader
+    except ImportError:
+        from yaml import SafeLoader
+    
+    return yaml.load(data, Loader=SafeLoader)
+
+def read_config_bytes(config_path=CONFIG_PATH):
+    """Return the raw contents of config.yaml"""
+    with open(config_path, 'rb', buffering=CONFIG_READ_BUFFER_SIZE) as file:
+        return file.read()
 
 class Config:
-    def __init__(self):
-        self.load_config()
+    def __init__(self, config_data=None):
+        # Environment is fixed for the life of the process
+        self._environment = os.environ.get("ENVIRONMENT", "dev")
+        self._is_prod = self._environment.lower() == "prod"
+        self.load_config(config_data)
     
-    def load_config(self):
-        """Load configuration from YAML file"""
-        config_path = Path(__file__).parent / "config.yaml"
+    @classmethod
+    def from_yaml(cls, config_data):
+        """Build configuration from already-parsed config.yaml data"""
+        return cls(config_data)
+    
+    def load_config(self, config_data=None):
+        """Load configuration from YAML file (or already-parsed YAML data)"""
+        if config_data is None:
+            # Uncached; get_config() is the cached entry point
+            config_data = parse_yaml(read_config_bytes())
         
-        with open(config_path, 'r') as file:
-            config_data = yaml.safe_load(file)
+        merged = _deep_merge(_DEFAULTS, config_data)
+        aws_config = merged['aws']
+        chatbot_config = merged['chatbot']
+        ui_config = merged['ui']
+        bedrock_config = merged['bedrock']
+        opensearch_config = merged['opensearch']
+        lambda_config = merged['lambda']
         
         # AWS Configuration
-        aws_config = config_data.get('aws', {})
-        self.AWS_REGION = os.environ.get("CDK_DEFAULT_REGION", aws_config.get('region', 'us-west-2'))
-        self.AWS_ACCOUNT = os.environ.get("CDK_DEFAULT_ACCOUNT", aws_config.get('account'))
+        self.AWS_REGION = os.environ.get("CDK_DEFAULT_REGION", aws_config['region'])
+        self.AWS_ACCOUNT = os.environ.get("CDK_DEFAULT_ACCOUNT", aws_config['account'])
         
         # Stack Configuration
-        stack_config = config_data.get('stack', {})
-        self.STACK_NAME = stack_config.get('name', 'ChatbotFrameworkStack')
+        self.STACK_NAME = merged['stack']['name']
         
         # Chatbot Configuration
-        chatbot_config = config_data.get('chatbot', {})
-        self.USE_CLASSIFIER = chatbot_config.get('use_classifier', False)
+        self.USE_CLASSIFIER = chatbot_config['use_classifier']
         
         # Model Configuration
-        models_config = chatbot_config.get('models', {})
-        self.CLASSIFIER_MODEL_ID = models_config.get('classifier', 'us.amazon.nova-lite-v1:0')
-        self.RAG_MODEL_ID = models_config.get('rag', 'anthropic.claude-3-5-sonnet-20241022-v2:0')
+        self.CLASSIFIER_MODEL_ID = chatbot_config['models']['classifier']
+        self.RAG_MODEL_ID = chatbot_config['models']['rag']
         
         # Prompt Configuration
-        prompt_config = chatbot_config.get('prompt', {})
-        self.SYSTEM_PROMPT = prompt_config.get('system', 'You are a helpful assistant.')
-        self.CLASSIFIER_PROMPT = prompt_config.get('classifier', 'Classify this message as greeting, farewell, or knowledge_base: {user_input}')
+        self.SYSTEM_PROMPT = chatbot_config['prompt']['system']
+        self.CLASSIFIER_PROMPT = chatbot_config['prompt']['classifier']
         
         # Response Configuration
-        responses_config = chatbot_config.get('responses', {})
-        self.GREETING_RESPONSE = responses_config.get('greeting', 'Hello! How can I help you today?')
-        self.FAREWELL_RESPONSE = responses_config.get('farewell', 'Thank you! Have a great day!')
+        self.GREETING_RESPONSE = chatbot_config['responses']['greeting']
+        self.FAREWELL_RESPONSE = chatbot_config['responses']['farewell']
         
         # UI Configuration
-        ui_config = config_data.get('ui', {})
-        self.CHATBOT_NAME = ui_config.get('name', 'My AI Assistant')
-        self.CHATBOT_DESCRIPTION = ui_config.get('description', 'Get help with information and questions')
-        self.WELCOME_MESSAGE = ui_config.get('welcome_message', 'Welcome! How can I help you today?')
-        colors_config = ui_config.get('colors', {})
-        self.UI_PRIMARY_COLOR = colors_config.get('primary', '#1A2F71')
-        self.UI_SECONDARY_COLOR = colors_config.get('secondary', '#48AEB2')
-        self.UI_BACKGROUND_GRADIENT_START = colors_config.get('background_gradient_start', '#1A2F71')
-        self.UI_BACKGROUND_GRADIENT_END = colors_config.get('background_gradient_end', '#48AEB2')
+        self.CHATBOT_NAME = ui_config['name']
+        self.CHATBOT_DESCRIPTION = ui_config['description']
+        self.WELCOME_MESSAGE = ui_config['welcome_message']
+        colors_config = ui_config['colors']
+        self.UI_PRIMARY_COLOR = colors_config['primary']
+        self.UI_SECONDARY_COLOR = colors_config['secondary']
+        self.UI_BACKGROUND_GRADIENT_START = colors_config['background_gradient_start']
+        self.UI_BACKGROUND_GRADIENT_END = colors_config['background_gradient_end']
         
         # S3 Configuration
-        s3_config = config_data.get('s3', {})
-        self.S3_KB_BUCKET = s3_config.get('knowledge_base_bucket', 'my-existing-documents-bucket')
-        self.S3_FRONTEND_BUCKET = s3_config.get('frontend_bucket', 'chatbot-frontend')
+        self.S3_KB_BUCKET = merged['s3']['knowledge_base_bucket']
+        self.S3_FRONTEND_BUCKET = merged['s3']['frontend_bucket']
         
         # DynamoDB Configuration
-        dynamodb_config = config_data.get('dynamodb', {})
-        self.DYNAMODB_TABLE_NAME = dynamodb_config.get('table_name', 'chatbot-conversations')
+        self.DYNAMODB_TABLE_NAME = merged['dynamodb']['table_name']
         
         # Bedrock Configuration
-        bedrock_config = config_data.get('bedrock', {})
-        self.KNOWLEDGE_BASE_ID = os.environ.get("KNOWLEDGE_BASE_ID", bedrock_config.get('knowledge_base_id'))
-        self.KNOWLEDGE_BASE_NAME = bedrock_config.get('knowledge_base_name', 'MyKnowledgeBase')
-        self.EMBEDDING_MODEL = bedrock_config.get('embedding_model', 'amazon.titan-embed-text-v2:0')
+        self.KNOWLEDGE_BASE_ID = os.environ.get("KNOWLEDGE_BASE_ID", bedrock_config['knowledge_base_id'])
+        self.KNOWLEDGE_BASE_NAME = bedrock_config['knowledge_base_name']
+        self.EMBEDDING_MODEL = bedrock_config['embedding_model']
         
         # Search Configuration
-        search_config = bedrock_config.get('search', {})
-        self.SEARCH_TYPE = search_config.get('type', 'SEMANTIC')
-        self.NUMBER_OF_RESULTS = search_config.get('number_of_results', 10)
+        self.SEARCH_TYPE = bedrock_config['search']['type']
+        self.NUMBER_OF_RESULTS = bedrock_config['search']['number_of_results']
         
         # Chunking Configuration
-        chunking_config = bedrock_config.get('chunking', {})
-        self.CHUNKING_STRATEGY = chunking_config.get('strategy', 'SEMANTIC')
-        self.CHUNKING_MAX_TOKENS = chunking_config.get('max_tokens', 300)
-        self.CHUNKING_BUFFER_SIZE = chunking_config.get('buffer_size', 0)
-        self.CHUNKING_BREAKPOINT_THRESHOLD = chunking_config.get('breakpoint_percentile_threshold', 95)
+        chunking_config = bedrock_config['chunking']
+        self.CHUNKING_STRATEGY = chunking_config['strategy']
+        self.CHUNKING_MAX_TOKENS = chunking_config['max_tokens']
+        self.CHUNKING_BUFFER_SIZE = chunking_config['buffer_size']
+        self.CHUNKING_BREAKPOINT_THRESHOLD = chunking_config['breakpoint_percentile_threshold']
         
         # OpenSearch Configuration
-        opensearch_config = config_data.get('opensearch', {})
-        self.OPENSEARCH_DOMAIN_NAME = opensearch_config.get('domain_name', 'chatbot-kb')
-        self.OPENSEARCH_VERSION = opensearch_config.get('version', '2.3')
-        self.OPENSEARCH_INSTANCE_TYPE = opensearch_config.get('instance_type', 't3.small.search')
-        self.OPENSEARCH_INSTANCE_COUNT = opensearch_config.get('instance_count', 1)
-        self.OPENSEARCH_VOLUME_SIZE = opensearch_config.get('volume_size', 10)
-        self.OPENSEARCH_VOLUME_TYPE = opensearch_config.get('volume_type', 'gp3')
-        self.OPENSEARCH_INDEX_NAME = opensearch_config.get('index_name', 'chatbotindex')
-        self.OPENSEARCH_VECTOR_FIELD = opensearch_config.get('vector_field', 'vector')
-        self.OPENSEARCH_TEXT_FIELD = opensearch_config.get('text_field', 'text')
-        self.OPENSEARCH_METADATA_FIELD = opensearch_config.get('metadata_field', 'metadata')
-        self.OPENSEARCH_VECTOR_DIMENSION = opensearch_config.get('vector_dimension', 1024)
-        self.OPENSEARCH_SPACE_TYPE = opensearch_config.get('space_type', 'l2')
-        self.OPENSEARCH_ENGINE = opensearch_config.get('engine', 'FAISS')
+        self.OPENSEARCH_DOMAIN_NAME = opensearch_config['domain_name']
+        self.OPENSEARCH_VERSION = opensearch_config['version']
+        self.OPENSEARCH_INSTANCE_TYPE = opensearch_config['instance_type']
+        self.OPENSEARCH_INSTANCE_COUNT = opensearch_config['instance_count']
+        self.OPENSEARCH_VOLUME_SIZE = opensearch_config['volume_size']
+        self.OPENSEARCH_VOLUME_TYPE = opensearch_config['volume_type']
+        self.OPENSEARCH_INDEX_NAME = opensearch_config['index_name']
+        self.OPENSEARCH_VECTOR_FIELD = opensearch_config['vector_field']
+        self.OPENSEARCH_TEXT_FIELD = opensearch_config['text_field']
+        self.OPENSEARCH_METADATA_FIELD = opensearch_config['metadata_field']
+        self.OPENSEARCH_VECTOR_DIMENSION = opensearch_config['vector_dimension']
+        self.OPENSEARCH_SPACE_TYPE = opensearch_config['space_type']
+        self.OPENSEARCH_ENGINE = opensearch_config['engine']
         
         # Lambda Configuration
-        lambda_config = config_data.get('lambda', {})
-        self.LAMBDA_TIMEOUT = lambda_config.get('timeout', 300)
-        self.LAMBDA_MEMORY = lambda_config.get('memory', 512)
-        self.LAMBDA_RUNTIME = lambda_config.get('runtime', 'python3.13')
+        self.LAMBDA_TIMEOUT = lambda_config['timeout']
+        self.LAMBDA_MEMORY = lambda_config['memory']
+        self.LAMBDA_RUNTIME = lambda_config['runtime']
         
         # Lambda-specific configurations
-        chatbot_lambda_config = lambda_config.get('chatbot', {})
-        self.CHATBOT_TIMEOUT = chatbot_lambda_config.get('timeout', 300)
-        self.CHATBOT_MEMORY = chatbot_lambda_config.get('memory', 1024)
-        
-        webscraper_lambda_config = lambda_config.get('webscraper', {})
-        self.WEBSCRAPER_TIMEOUT = webscraper_lambda_config.get('timeout', 900)
-        self.WEBSCRAPER_MEMORY = webscraper_lambda_config.get('memory', 1024)
-        self.WEBSCRAPER_MAX_WORKERS = webscraper_lambda_config.get('max_workers', 4)
-        self.WEBSCRAPER_MAX_PAGES = webscraper_lambda_config.get('max_pages', 200)
-        self.WEBSCRAPER_EXCLUDED_URLS = webscraper_lambda_config.get('excluded_urls', [])
-        self.WEBSCRAPER_WEBSITES = webscraper_lambda_config.get('websites_to_scrape', [])
-        
-        # Lambda environment variables
-        env_vars_config = lambda_config.get('environment_variables', {})
-        self.LAMBDA_ENV_VARS = {
-            'CHATBOT_NAME': self.CHATBOT_NAME,
-            'CHATBOT_DESCRIPTION': self.CHATBOT_DESCRIPTION,
-            'WELCOME_MESSAGE': self.WELCOME_MESSAGE,
-            'USE_CLASSIFIER': str(self.USE_CLASSIFIER).lower(),
-            'CLASSIFIER_MODEL_ID': self.CLASSIFIER_MODEL_ID,
-            'RAG_MODEL_ID': self.RAG_MODEL_ID,
-            'SEARCH_TYPE': self.SEARCH_TYPE,
-            'NUMBER_OF_RESULTS': str(self.NUMBER_OF_RESULTS),
-            'SYSTEM_PROMPT': self.SYSTEM_PROMPT,
-            'CLASSIFIER_PROMPT': self.CLASSIFIER_PROMPT,
-            'GREETING_RESPONSE': self.GREETING_RESPONSE,
-            'FAREWELL_RESPONSE': self.FAREWELL_RESPONSE
-        }
+        self.CHATBOT_TIMEOUT = lambda_config['chatbot']['timeout']
+        self.CHATBOT_MEMORY = lambda_config['chatbot']['memory']
+        
+        webscraper_lambda_config = lambda_config['webscraper']
+        self.WEBSCRAPER_TIMEOUT = webscraper_lambda_config['timeout']
+        self.WEBSCRAPER_MEMORY = webscraper_lambda_config['memory']
+        self.WEBSCRAPER_MAX_WORKERS = webscraper_lambda_config['max_workers']
+        self.WEBSCRAPER_MAX_PAGES = webscraper_lambda_config['max_pages']
+        self.WEBSCRAPER_EXCLUDED_URLS = webscraper_lambda_config['excluded_urls']
+        self.WEBSCRAPER_WEBSITES = webscraper_lambda_config['websites_to_scrape']
         
         # API Gateway Configuration
-        api_config = config_data.get('api', {})
-        self.API_NAME = api_config.get('name', 'ChatbotAPI')
-        cors_config = api_config.get('cors', {})
-        self.API_CORS_ALLOW_ORIGINS = cors_config.get('allow_origins', ['*'])
-        self.API_CORS_ALLOW_METHODS = cors_config.get('allow_methods', ['GET', 'POST', 'OPTIONS'])
-        self.API_CORS_ALLOW_HEADERS = cors_config.get('allow_headers', ['Content-Type', 'Authorization'])
+        api_config = merged['api']
+        self.API_NAME = api_config['name']
+        cors_config = api_config['cors']
+        self.API_CORS_ALLOW_ORIGINS = cors_config['allow_origins']
+        self.API_CORS_ALLOW_METHODS = cors_config['allow_methods']
+        self.API_CORS_ALLOW_HEADERS = cors_config['allow_headers']
         
         # CloudFront Configuration
-        cloudfront_config = config_data.get('cloudfront', {})
-        self.CLOUDFRONT_DEFAULT_ROOT_OBJECT = cloudfront_config.get('default_root_object', 'index.html')
-        self.CLOUDFRONT_ERROR_RESPONSES = cloudfront_config.get('error_responses', [])
+        cloudfront_config = merged['cloudfront']
+        self.CLOUDFRONT_DEFAULT_ROOT_OBJECT = cloudfront_config['default_root_object']
+        self.CLOUDFRONT_ERROR_RESPONSES = cloudfront_config['error_responses']
+        self.CLOUDFRONT_CACHING_ENABLED = cloudfront_config['caching']['enabled']
         
         # Environment-specific overrides
         env = self.get_environment()
-        env_config = config_data.get('environments', {}).get(env, {})
+        env_config = merged['environments'].get(env) or {}
         
         if 'cors_origins' in env_config:
             self.API_CORS_ALLOW_ORIGINS = env_config['cors_origins']
@@ -164,36 +292,132 @@ class Config:
         
         if opensearch_suffix:
             self.OPENSEARCH_DOMAIN_NAME = f"{self.OPENSEARCH_DOMAIN_NAME}-{opensearch_suffix}"
+        
+        self._stack_name = f"{self.STACK_NAME}-{env}" if env != "prod" else self.STACK_NAME
+        
+        # Final resource names, computed once
+        self._s3_kb_bucket_name = f"{self.S3_KB_BUCKET}-{self.AWS_ACCOUNT}-{self.AWS_REGION}"
+        self._s3_frontend_bucket_name = f"{self.S3_FRONTEND_BUCKET}-{self.AWS_ACCOUNT}-{self.AWS_REGION}"
+        # Use last 6 digits of account to stay under 28 char limit
+        account_suffix = str(self.AWS_ACCOUNT)[-6:] if self.AWS_ACCOUNT else "123456"
+        if env != "prod":
+            self._opensearch_domain_name = f"{self.OPENSEARCH_DOMAIN_NAME}-{env}-{account_suffix}"[:28]
+        else:
+            self._opensearch_domain_name = f"{self.OPENSEARCH_DOMAIN_NAME}-{account_suffix}"[:28]
+        self._dynamodb_table_name = f"{self.DYNAMODB_TABLE_NAME}-{self.AWS_ACCOUNT}"
+    
+    @functools.cached_property
+    def LAMBDA_ENV_VARS(self):
+        """Lambda environment variables, built on first use"""
+        return {
+            'CHATBOT_NAME': self.CHATBOT_NAME,
+            'CHATBOT_DESCRIPTION': self.CHATBOT_DESCRIPTION,
+            'WELCOME_MESSAGE': self.WELCOME_MESSAGE,
+            'USE_CLASSIFIER': str(self.USE_CLASSIFIER).lower(),
+            'CLASSIFIER_MODEL_ID': self.CLASSIFIER_MODEL_ID,
+            'RAG_MODEL_ID': self.RAG_MODEL_ID,
+            'SEARCH_TYPE': self.SEARCH_TYPE,
+            'NUMBER_OF_RESULTS': str(self.NUMBER_OF_RESULTS),
+            'SYSTEM_PROMPT': self.SYSTEM_PROMPT,
+            'CLASSIFIER_PROMPT': self.CLASSIFIER_PROMPT,
+            'GREETING_RESPONSE': self.GREETING_RESPONSE,
+            'FAREWELL_RESPONSE': self.FAREWELL_RESPONSE
+        }
+    
+    @functools.cached_property
+    def cloudfront_error_responses(self):
+        """CloudFront ErrorResponse objects for CLOUDFRONT_ERROR_RESPONSES, built on first use"""
+        from aws_cdk import aws_cloudfront as cloudfront
+        return [
+            cloudfront.ErrorResponse(
+                http_status=error_config['http_status'],
+                response_http_status=error_config['response_http_status'],
+                response_page_path=error_config['response_page_path']
+            )
+            for error_config in self.CLOUDFRONT_ERROR_RESPONSES
+        ]
+    
+    def __getstate__(self):
+        # CDK objects don't pickle; they are rebuilt on demand
+        state = self.__dict__.copy()
+        state.pop('cloudfront_error_responses', None)
+        return state
     
     def get_environment(self):
-        return os.environ.get("ENVIRONMENT", "dev")
+        return self._environment
     
     def is_production(self):
-        return self.get_environment().lower() == "prod"
+        return self._is_prod
     
     def get_stack_name(self):
-        env = self.get_environment()
-        return f"{self.STACK_NAME}-{env}" if env != "prod" else self.STACK_NAME
+        return self._stack_name
     
     def get_s3_bucket_name(self, bucket_type='kb'):
         """Get S3 bucket name with account and region suffix"""
-        base_name = self.S3_KB_BUCKET if bucket_type == 'kb' else self.S3_FRONTEND_BUCKET
-        return f"{base_name}-{self.AWS_ACCOUNT}-{self.AWS_REGION}"
+        return self._s3_kb_bucket_name if bucket_type == 'kb' else self._s3_frontend_bucket_name
     
     def get_opensearch_domain_name(self):
         """Get OpenSearch domain name with account suffix (max 28 chars)"""
-        # Use last 6 digits of account to stay under 28 char limit
-        account_suffix = str(self.AWS_ACCOUNT)[-6:] if self.AWS_ACCOUNT else "123456"
-        env = self.get_environment()
-        base_name = self.OPENSEARCH_DOMAIN_NAME
-        if env != "prod":
-            return f"{base_name}-{env}-{account_suffix}"[:28]
-        return f"{base_name}-{account_suffix}"[:28]
+        return self._opensearch_domain_name
     
     def get_dynamodb_table_name(self):
         """Get DynamoDB table name with account suffix"""
-        return f"{self.DYNAMODB_TABLE_NAME}-{self.AWS_ACCOUNT}"
+        return self._dynamodb_table_name
+
+def _pickle_path(key):
+    """Pickle file for a cache key; config.py's own mtime is mixed in so code changes invalidate it"""
+    digest = hashlib.blake2b(repr((key, os.stat(__file__).st_mtime_ns)).encode(), digest_size=16).hexdigest()
+    return os.path.join(CONFIG_PICKLE_DIR, f"{CONFIG_PICKLE_PREFIX}{digest}.pkl")
+
+def _load_pickled_config(path):
+    """Return the pickled Config at path, or None if missing, foreign or unreadable"""
+    try:
+        with open(path, 'rb') as file:
+            # Only trust pickles written by the current user
+            if hasattr(os, "getuid") and os.fstat(file.fileno()).st_uid != os.getuid():
+                return None
+            config = pickle.load(file)
+    except Exception:
+        # Corrupt or foreign pickles can raise almost anything (ValueError for an
+        # unsupported protocol, TypeError, KeyError, ...); all of them are a cache miss
+        return None
+    return config if isinstance(config, Config) else None
+
+def _save_pickled_config(path, config):
+    """Atomically write config to path and sweep stale pickles; failures are ignored"""
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=CONFIG_PICKLE_DIR, prefix=CONFIG_PICKLE_PREFIX, suffix=".tmp")
+        with os.fdopen(fd, 'wb') as file:
+            pickle.dump(config, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError:
+        return
+    sweep_pickled_configs()
+
+def sweep_pickled_configs(max_age_days=CONFIG_PICKLE_MAX_AGE_DAYS):
+    """Remove cached config pickles not touched in max_age_days"""
+    cutoff = time.time() - max_age_days * 86400
+    for path in glob.glob(os.path.join(CONFIG_PICKLE_DIR, f"{CONFIG_PICKLE_PREFIX}*.pkl")):
+        try:
+            if os.stat(path).st_mtime < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+# Config instances keyed by config.yaml content hash and environment
+_config_cache = {}
 
 def get_config():
-    """Get configuration instance"""
-    return Config()
\ No newline at end of file
+    """Get configuration instance, shared until config.yaml content or the environment changes"""
+    data = read_config_bytes()
+    key = (hashlib.blake2b(data, digest_size=16).digest(), tuple(os.environ.get(name) for name in CONFIG_ENV_VARS))
+    config = _config_cache.get(key)
+    if config is None:
+        _config_cache.clear()
+        pickle_path = _pickle_path(key)
+        config = _load_pickled_config(pickle_path)
+        if config is None:
+            config = Config.from_yaml(parse_yaml(data))
+            _save_pickled_config(pickle_path, config)
+        _config_cache[key] = config
+    return config
@@ -21,12 +21,56 @@ from constructs import Construct
 from config import get_config
 import json
 
+# botocore service models the chatbot Lambda uses; the rest are pruned from its layer
+_CHATBOT_BOTOCORE_SERVICES = ("bedrock-runtime", "bedrock-agent-runtime", "s3", "dynamodb")
+
+# config.yaml opensearch.version -> CDK engine version
+_OPENSEARCH_VERSIONS = {
+    "1.0": opensearch.EngineVersion.OPENSEARCH_1_0,
+    "1.1": opensearch.EngineVersion.OPENSEARCH_1_1,
+    "1.2": opensearch.EngineVersion.OPENSEARCH_1_2,
+    "1.3": opensearch.EngineVersion.OPENSEARCH_1_3,
+    "2.3": opensearch.EngineVersion.OPENSEARCH_2_3,
+    "2.5": opensearch.EngineVersion.OPENSEARCH_2_5,
+    "2.7": opensearch.EngineVersion.OPENSEARCH_2_7,
+    "2.9": opensearch.EngineVersion.OPENSEARCH_2_9,
+    "2.10": opensearch.EngineVersion.OPENSEARCH_2_10,
+    "2.11": opensearch.EngineVersion.OPENSEARCH_2_11,
+    "2.13": opensearch.EngineVersion.OPENSEARCH_2_13,
+    "2.15": opensearch.EngineVersion.OPENSEARCH_2_15,
+    "2.17": opensearch.EngineVersion.OPENSEARCH_2_17,
+    "2.19": opensearch.EngineVersion.OPENSEARCH_2_19,
+}
+
+# config.yaml opensearch.volume_type -> EBS volume type
+_EBS_VOLUME_TYPES = {
+    "standard": ec2.EbsDeviceVolumeType.STANDARD,
+    "gp2": ec2.EbsDeviceVolumeType.GP2,
+    "gp3": ec2.EbsDeviceVolumeType.GP3,
+    "io1": ec2.EbsDeviceVolumeType.IO1,
+    "io2": ec2.EbsDeviceVolumeType.IO2,
+    "st1": ec2.EbsDeviceVolumeType.ST1,
+    "sc1": ec2.EbsDeviceVolumeType.SC1,
+}
+
 class ChatbotStack(Stack):
     def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
         
         # Load configuration
         self.config = get_config()
+        
+        # Names and ARNs shared across several constructs
+        opensearch_domain_name = self.config.get_opensearch_domain_name()
+        domain_wildcard_arn = f"arn:aws:es:{self.region}:{self.account}:domain/{opensearch_domain_name}/*"
+        embedding_model_arn = f"arn:aws:bedrock:{self.region}::foundation-model/{self.config.EMBEDDING_MODEL}"
+        
+        opensearch_version = str(self.config.OPENSEARCH_VERSION)
+        if opensearch_version not in _OPENSEARCH_VERSIONS:
+            raise ValueError(f"Unsupported OpenSearch version '{opensearch_version}', expected one of: {', '.join(_OPENSEARCH_VERSIONS)}")
+        volume_type = self.config.OPENSEARCH_VOLUME_TYPE.lower()
+        if volume_type not in _EBS_VOLUME_TYPES:
+            raise ValueError(f"Unsupported EBS volume type '{volume_type}', expected one of: {', '.join(_EBS_VOLUME_TYPES)}")
 
         # S3 Bucket for knowledge base documents
         source_bucket = s3.Bucket(
@@ -40,15 +84,15 @@ class ChatbotStack(Stack):
         # OpenSearch Domain for Knowledge Base
         domain = opensearch.Domain(
             self, "KnowledgeBaseOpenSearch",
-            domain_name=self.config.get_opensearch_domain_name(),
-            version=getattr(opensearch.EngineVersion, f"OPENSEARCH_{str(self.config.OPENSEARCH_VERSION).replace('.', '_')}"),
+            domain_name=opensearch_domain_name,
+            version=_OPENSEARCH_VERSIONS[opensearch_version],
             capacity=opensearch.CapacityConfig(
                 data_node_instance_type=self.config.OPENSEARCH_INSTANCE_TYPE,
                 data_nodes=self.config.OPENSEARCH_INSTANCE_COUNT
             ),
             ebs=opensearch.EbsOptions(
                 volume_size=self.config.OPENSEARCH_VOLUME_SIZE,
-                volume_type=getattr(ec2.EbsDeviceVolumeType, self.config.OPENSEARCH_VOLUME_TYPE.upper())
+                volume_type=_EBS_VOLUME_TYPES[volume_type]
             ),
             node_to_node_encryption=True,
             encryption_at_rest=opensearch.EncryptionAtRestOptions(enabled=True),
@@ -57,10 +101,21 @@ class ChatbotStack(Stack):
             vpc=None
         )
 
+        # Domain ARNs used by the IAM policies below
+        domain_arn = domain.domain_arn
+        domain_arn_all = f"{domain_arn}/*"
+        domain_arn_index = f"{domain_arn}/{self.config.OPENSEARCH_INDEX_NAME}"
+        domain_arn_index_all = f"{domain_arn_index}/*"
+
         # IAM Role for Bedrock Knowledge Base
-        bedrock_kb_role = iam.Role(
-            self, "BedrockKnowledgeBaseRole",
+        bedrock_role = iam.Role(
+            self, "BedrockKBRole",
             assumed_by=iam.ServicePrincipal("bedrock.amazonaws.com"),
+            managed_policies=[
+                iam.ManagedPolicy.from_aws_managed_policy_name("AmazonBedrockFullAccess"),
+                iam.ManagedPolicy.from_aws_managed_policy_name("AmazonOpenSearchServiceFullAccess"),
+                iam.ManagedPolicy.from_aws_managed_policy_name("AmazonS3ReadOnlyAccess")
+            ],
             inline_policies={
                 "S3Access": iam.PolicyDocument(
                     statements=[
@@ -83,7 +138,7 @@ class ChatbotStack(Stack):
                                 "bedrock:InvokeModel"
                             ],
                             resources=[
-                                f"arn:aws:bedrock:{self.region}::foundation-model/amazon.titan-embed-text-v2:0"
+                                embedding_model_arn
                             ]
                         )
                     ]
@@ -97,7 +152,7 @@ class ChatbotStack(Stack):
                                 "es:DescribeDomain"
                             ],
                             resources=[
-                                domain.domain_arn
+                                domain_arn
                             ]
                         ),
                         # Index-level access for CRUD operations
@@ -110,7 +165,7 @@ class ChatbotStack(Stack):
                                 "es:ESHttpDelete"
                             ],
                             resources=[
-                                f"{domain.domain_arn}/{self.config.OPENSEARCH_INDEX_NAME}/*"
+                                domain_arn_index_all
                             ]
                         ),
                         # Index metadata access
@@ -121,7 +176,7 @@ class ChatbotStack(Stack):
                                 "es:ESHttpHead"
                             ],
                             resources=[
-                                f"{domain.domain_arn}/{self.config.OPENSEARCH_INDEX_NAME}"
+                                domain_arn_index
                             ]
                         )
                     ]
@@ -129,16 +184,16 @@ class ChatbotStack(Stack):
             }
         )
 
-        # Add access policies to domain after bedrock_kb_role is defined
+        # Add access policies to domain after bedrock_role is defined
         domain.add_access_policies(
             iam.PolicyStatement(
                 principals=[
                     iam.ServicePrincipal("bedrock.amazonaws.com"),
-                    bedrock_kb_role,
+                    bedrock_role,
                     iam.AccountRootPrincipal()
                 ],
                 actions=["es:*"],
-                resources=[f"arn:aws:es:{self.region}:{self.account}:domain/{self.config.get_opensearch_domain_name()}/*"]
+                resources=[domain_wildcard_arn]
             )
         )
 
@@ -180,8 +235,8 @@ class ChatbotStack(Stack):
                                 "es:ListElasticsearchInstanceTypes"
                             ],
                             resources=[
-                                domain.domain_arn, 
-                                f"{domain.domain_arn}/*",
+                                domain_arn, 
+                                domain_arn_all,
                                 "*" 
                             ]
                         ),
@@ -190,8 +245,8 @@ class ChatbotStack(Stack):
                                 "opensearch:*"
                             ],
                             resources=[
-                                domain.domain_arn,
-                                f"{domain.domain_arn}/*",
+                                domain_arn,
+                                domain_arn_all,
                                 "*"
                             ]
                         )
@@ -209,7 +264,8 @@ class ChatbotStack(Stack):
             timeout=Duration.minutes(10),
             layers=[opensearch_layer],
             environment={
-                "DOMAIN_NAME": self.config.get_opensearch_domain_name(),
+                "DOMAIN_NAME": opensearch_domain_name,
+                "DOMAIN_ENDPOINT": domain.domain_endpoint,
                 "REGION": self.region
             },
             code=lambda_.Code.from_asset("scripts")
@@ -223,7 +279,7 @@ class ChatbotStack(Stack):
                 on_event_handler=index_creator
             ).service_token,
             properties={
-                "DomainName": self.config.get_opensearch_domain_name(),
+                "DomainName": opensearch_domain_name,
                 "IndexName": self.config.OPENSEARCH_INDEX_NAME,
                 "Region": self.region
             }
@@ -232,15 +288,6 @@ class ChatbotStack(Stack):
         # Ensure index is created after domain
         index_creation.node.add_dependency(domain)
 
-        bedrock_role = iam.Role(self, "BedrockKBRole",
-            assumed_by=iam.ServicePrincipal("bedrock.amazonaws.com"),
-            managed_policies=[
-                iam.ManagedPolicy.from_aws_managed_policy_name("AmazonBedrockFullAccess"),
-                iam.ManagedPolicy.from_aws_managed_policy_name("AmazonOpenSearchServiceFullAccess"),
-                iam.ManagedPolicy.from_aws_managed_policy_name("AmazonS3ReadOnlyAccess")
-            ]
-        )
-
         # Create the Knowledge Base
         kb = bedrock.CfnKnowledgeBase(self, "KnowledgeBase",
             name=self.config.KNOWLEDGE_BASE_NAME,
@@ -248,14 +295,14 @@ class ChatbotStack(Stack):
             knowledge_base_configuration=bedrock.CfnKnowledgeBase.KnowledgeBaseConfigurationProperty(
                 type="VECTOR",
                 vector_knowledge_base_configuration=bedrock.CfnKnowledgeBase.VectorKnowledgeBaseConfigurationProperty(
-                    embedding_model_arn=f"arn:aws:bedrock:{self.region}::foundation-model/{self.config.EMBEDDING_MODEL}"
+                    embedding_model_arn=embedding_model_arn
                 ),
             ),
             storage_configuration=bedrock.CfnKnowledgeBase.StorageConfigurationProperty(
                 type="OPENSEARCH_MANAGED_CLUSTER",
                 opensearch_managed_cluster_configuration=bedrock.CfnKnowledgeBase.OpenSearchManagedClusterConfigurationProperty(
                     domain_endpoint=f"https://{domain.domain_endpoint}",
-                    domain_arn=domain.domain_arn,
+                    domain_arn=domain_arn,
                     vector_index_name=self.config.OPENSEARCH_INDEX_NAME,
                     field_mapping=bedrock.CfnKnowledgeBase.OpenSearchManagedClusterFieldMappingProperty(
                         vector_field=self.config.OPENSEARCH_VECTOR_FIELD,
@@ -306,6 +353,14 @@ class ChatbotStack(Stack):
             description="Web scraping dependencies"
         )
 
+        # Scrape completion markers are kept out of the knowledge base bucket so syncs never ingest them
+        scrape_status_bucket = s3.Bucket(
+            self, "ScrapeStatusBucket",
+            removal_policy=RemovalPolicy.DESTROY,
+            auto_delete_objects=True,
+            lifecycle_rules=[s3.LifecycleRule(expiration=Duration.days(7))]
+        )
+
         # Web Scraper Lambda Function
         webscraper_lambda = lambda_.Function(
             self, "WebScraperLambda",
@@ -316,13 +371,30 @@ class ChatbotStack(Stack):
             timeout=Duration.seconds(self.config.WEBSCRAPER_TIMEOUT),
             layers=[webscraper_layer],
             environment={
-                "S3_BUCKET_NAME": source_bucket.bucket_name
+                "S3_BUCKET_NAME": source_bucket.bucket_name,
+                "SCRAPE_STATUS_BUCKET": scrape_status_bucket.bucket_name
             },
-            memory_size=self.config.WEBSCRAPER_MEMORY
+            memory_size=self.config.WEBSCRAPER_MEMORY,
+            # Scrapes are invoked asynchronously; a timed-out crawl shouldn't rerun twice
+            retry_attempts=0
         )
 
-        # Grant S3 permissions to webscraper Lambda
-        source_bucket.grant_write(webscraper_lambda)
+        # Grant S3 permissions to webscraper Lambda (read/list for existence checks)
+        source_bucket.grant_read_write(webscraper_lambda)
+        scrape_status_bucket.grant_put(webscraper_lambda)
+        
+        # Let the webscraper dispatch child scrapes to itself. A separate policy keeps
+        # the function from depending on a statement that references its own ARN.
+        iam.Policy(
+            self, "WebScraperDispatchPolicy",
+            roles=[webscraper_lambda.role],
+            statements=[
+                iam.PolicyStatement(
+                    actions=["lambda:InvokeFunction"],
+                    resources=[webscraper_lambda.function_arn]
+                )
+            ]
+        )
         
         # Grant Bedrock permissions to webscraper for auto-sync
         webscraper_lambda.add_to_role_policy(
@@ -347,21 +419,57 @@ class ChatbotStack(Stack):
             billing_mode=aws_dynamodb.BillingMode.PAY_PER_REQUEST,
             removal_policy=RemovalPolicy.DESTROY
         )
+        
+        # Lets feedback locate a message without scanning the session partition
+        message_id_index = "session_id-message_id-index"
+        conversation_table.add_global_secondary_index(
+            index_name=message_id_index,
+            partition_key=aws_dynamodb.Attribute(
+                name="session_id",
+                type=aws_dynamodb.AttributeType.STRING
+            ),
+            sort_key=aws_dynamodb.Attribute(
+                name="message_id",
+                type=aws_dynamodb.AttributeType.STRING
+            ),
+            projection_type=aws_dynamodb.ProjectionType.KEYS_ONLY
+        )
 
         # Chatbot Lambda Function
         lambda_env_vars = self.config.LAMBDA_ENV_VARS.copy()
         lambda_env_vars.update({
             "DYNAMODB_TABLE": conversation_table.table_name,
+            "MESSAGE_ID_INDEX": message_id_index,
             "KNOWLEDGE_BASE_ID": kb.ref
         })
         
+        # Chatbot Layer (ships its own boto3 so unused botocore service models can be pruned)
+        keep_services = " ".join(f"! -name {service}" for service in _CHATBOT_BOTOCORE_SERVICES)
+        chatbot_layer = lambda_.LayerVersion(
+            self, "ChatbotLayer",
+            code=lambda_.Code.from_asset("backend/layers/chatbot-layer", bundling={
+                "image": lambda_.Runtime.PYTHON_3_13.bundling_image,
+                "command": [
+                    "bash", "-c",
+                    # Chatbot runs on Graviton; fetch aarch64 wheels (orjson is compiled)
+                    "pip install -r requirements.txt -t /asset-output/python "
+                    "--platform manylinux2014_aarch64 --implementation cp --python-version 3.13 --only-binary=:all: && "
+                    f"find /asset-output/python/botocore/data -mindepth 1 -maxdepth 1 -type d {keep_services} -exec rm -rf {{}} +"
+                ]
+            }),
+            compatible_runtimes=[lambda_.Runtime.PYTHON_3_13],
+            compatible_architectures=[lambda_.Architecture.ARM_64],
+            description="Chatbot dependencies"
+        )
+        
         chatbot_lambda = lambda_.Function(
             self, "ChatbotLambda",
             runtime=lambda_.Runtime.PYTHON_3_13,
-            architecture=lambda_.Architecture.X86_64,
+            architecture=lambda_.Architecture.ARM_64,
             handler="lambda_function.lambda_handler",
             code=lambda_.Code.from_asset("backend/lambda/chatbot"),
             timeout=Duration.seconds(self.config.CHATBOT_TIMEOUT),
+            layers=[chatbot_layer],
             memory_size=self.config.CHATBOT_MEMORY,
             environment=lambda_env_vars
         )
@@ -414,24 +522,8 @@ class ChatbotStack(Stack):
         )
 
         # CloudFront distribution with caching configuration
-        error_responses = []
-        for error_config in self.config.CLOUDFRONT_ERROR_RESPONSES:
-            error_responses.append(
-                cloudfront.ErrorResponse(
-                    http_status=error_config['http_status'],
-                    response_http_status=error_config['response_http_status'],
-                    response_page_path=error_config['response_page_path']
-                )
-            )
-        
         # Check if caching is enabled in config
-        # Load raw config data to access caching settings
-        import yaml
-        from pathlib import Path
-        config_path = Path(__file__).parent.parent / "config.yaml"
-        with open(config_path, 'r') as file:
-            config_data = yaml.safe_load(file)
-        caching_enabled = config_data.get('cloudfront', {}).get('caching', {}).get('enabled', True)
+        caching_enabled = self.config.CLOUDFRONT_CACHING_ENABLED
         
         # Create additional behaviors for different file types (only if caching enabled)
         additional_behaviors = {}
@@ -481,7 +573,7 @@ class ChatbotStack(Stack):
             ),
             additional_behaviors=additional_behaviors,
             default_root_object=self.config.CLOUDFRONT_DEFAULT_ROOT_OBJECT,
-            error_responses=error_responses
+            error_responses=self.config.cloudfront_error_responses
         )
 
         # Deploy React build to S3 (build folder must exist)
@@ -500,6 +592,12 @@ class ChatbotStack(Stack):
             description="Web scraper Lambda function ARN"
         )
 
+        CfnOutput(
+            self, "ScrapeStatusBucketName",
+            value=scrape_status_bucket.bucket_name,
+            description="Bucket holding web scraper completion markers"
+        )
+
         CfnOutput(
             self, "ChatbotLambdaArn",
             value=chatbot_lambda.function_arn,
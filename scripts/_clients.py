@@ -0,0 +1,39 @@
+"""
+Shared boto3 clients for the deployment scripts and the index creator Lambda.
+
+Each factory builds its client on first use and returns the same instance
+afterwards, so repeated invocations reuse loaded service models and connections.
+"""
+import functools
+
+import boto3
+from botocore.config import Config
+
+# Keep connections alive between calls so reused clients skip TCP/TLS setup
+# (urllib3 already sets TCP_NODELAY on its sockets)
+CLIENT_CONFIG = Config(connect_timeout=5, tcp_keepalive=True)
+
+# Absorb Lambda throttling (429) and transient service errors inside the SDK
+LAMBDA_CLIENT_CONFIG = CLIENT_CONFIG.merge(Config(
+    retries={'max_attempts': 5, 'mode': 'adaptive'}
+))
+
+@functools.lru_cache(maxsize=1)
+def lambda_client():
+    return boto3.client('lambda', config=LAMBDA_CLIENT_CONFIG)
+
+@functools.lru_cache(maxsize=1)
+def cfn_client():
+    return boto3.client('cloudformation', config=CLIENT_CONFIG)
+
+@functools.lru_cache(maxsize=1)
+def bedrock_agent_client():
+    return boto3.client('bedrock-agent', config=CLIENT_CONFIG)
+
+@functools.lru_cache(maxsize=1)
+def s3_client():
+    return boto3.client('s3', config=CLIENT_CONFIG)
+
+@functools.lru_cache(maxsize=None)
+def opensearch_client(region):
+    return boto3.client('opensearch', region_name=region, config=CLIENT_CONFIG)
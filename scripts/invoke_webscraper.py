@@ -3,18 +3,63 @@
 Script to invoke the web scraper Lambda function and sync knowledge base
 """
 
-import boto3
 import json
 import argparse
 import sys
+import math
 import time
+import hashlib
+import functools
 from pathlib import Path
+from botocore.exceptions import BotoCoreError, ClientError
 
-# Add parent directory to path to import config
+# Add parent directory to path to import config, and this directory for _clients
+# (also needed when imported as scripts.invoke_webscraper)
 sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
 from config import get_config
+from _clients import lambda_client, cfn_client, bedrock_agent_client, s3_client
 
-def invoke_webscraper(base_url, max_pages=200, max_workers=4, excluded_patterns=None):
+# Completion markers the scraper Lambda writes when a scrape finishes
+COMPLETION_MARKER_PREFIX = '_done/'
+
+# Marker polling backs off from the initial to the max delay (seconds)
+POLL_INITIAL_DELAY = 2
+POLL_MAX_DELAY = 30
+
+# Mirrors DISPATCH_DIRECT_LIMIT in the scraper Lambda: larger batches are split
+# into ~sqrt(N) groups, each adding another asynchronous dispatch hop
+DISPATCH_DIRECT_LIMIT = 32
+
+# Extra wait allowed per dispatch hop, covering time queued for async invocation
+DISPATCH_HOP_ALLOWANCE = 120
+
+# Stack outputs the scripts read, projected out of DescribeStacks as [key, value] pairs
+STACK_OUTPUT_KEYS = (
+    'WebScraperLambdaArn', 'S3BucketName', 'ScrapeStatusBucketName', 'KnowledgeBaseId', 'DataSourceId'
+)
+STACK_OUTPUTS_QUERY = "Stacks[0].Outputs[?{}].[OutputKey, OutputValue]".format(
+    " || ".join(f"OutputKey=='{key}'" for key in STACK_OUTPUT_KEYS)
+)
+
+@functools.lru_cache(maxsize=1)
+def get_stack_outputs(stack_name):
+    """Return the stack outputs in STACK_OUTPUT_KEYS as {OutputKey: OutputValue}, fetched once per process"""
+    paginator = cfn_client().get_paginator('describe_stacks')
+    # A stack without outputs yields None rather than an empty list
+    return dict(pair for pair in paginator.paginate(StackName=stack_name).search(STACK_OUTPUTS_QUERY) if pair)
+
+def completion_marker_key(base_url):
+    """
+    S3 key of the scraper's completion marker
+    
+    Contract with completion_marker_key in backend/lambda/webscraper/lambda_function.py
+    (which the scripts can't import): _done/ + first 8 hex chars of md5(base_url).
+    Change both together or polling silently times out.
+    """
+    return f"{COMPLETION_MARKER_PREFIX}{hashlib.md5(base_url.encode()).hexdigest()[:8]}.json"
+
+def invoke_webscraper(base_url, max_pages=200, max_workers=4, excluded_patterns=None, stack_outputs=None):
     """
     Invoke the web scraper Lambda function
     
@@ -23,29 +68,43 @@ def invoke_webscraper(base_url, max_pages=200, max_workers=4, excluded_patterns=
         max_pages (int): Maximum number of pages to scrape
         max_workers (int): Number of concurrent workers
         excluded_patterns (list): Additional URL patterns to exclude
+        stack_outputs (dict): Stack outputs from get_stack_outputs (looked up if omitted)
+    
+    Returns:
+        str: Request ID of the asynchronous invocation, or False if it could not be started
     """
-    config = get_config()
+    print(f"Invoking web scraper for: {base_url}")
+    return start_scrapes({'base_url': base_url}, [base_url], max_pages, max_workers,
+                         excluded_patterns, stack_outputs)
+
+def dispatch_webscrapers(base_urls, max_pages=200, max_workers=4, excluded_patterns=None, stack_outputs=None):
+    """
+    Invoke the web scraper Lambda once as a dispatcher that starts a scrape per base URL
     
-    # Initialize Lambda client with extended timeout
-    lambda_config = boto3.session.Config(read_timeout=900)  # 15 minutes
-    lambda_client = boto3.client('lambda', config=lambda_config)
+    Args:
+        base_urls (list): The base URLs to scrape
+        max_pages (int): Maximum number of pages to scrape per site
+        max_workers (int): Number of concurrent workers per site
+        excluded_patterns (list): Additional URL patterns to exclude
+        stack_outputs (dict): Stack outputs from get_stack_outputs (looked up if omitted)
     
-    # Get the Lambda function name from stack outputs
-    cloudformation = boto3.client('cloudformation')
-    stack_name = config.get_stack_name()
+    Returns:
+        str: Request ID of the dispatcher invocation, or False if it could not be started
+    """
+    print(f"Dispatching web scraper for {len(base_urls)} websites")
+    return start_scrapes({'urls': list(base_urls)}, base_urls, max_pages, max_workers,
+                         excluded_patterns, stack_outputs)
+
+def start_scrapes(payload, base_urls, max_pages, max_workers, excluded_patterns, stack_outputs):
+    """Clear stale completion markers and queue an asynchronous scraper invocation"""
+    config = get_config()
     
     try:
-        response = cloudformation.describe_stacks(StackName=stack_name)
-        outputs = response['Stacks'][0]['Outputs']
-        
-        webscraper_arn = None
-        s3_bucket = None
-        
-        for output in outputs:
-            if output['OutputKey'] == 'WebScraperLambdaArn':
-                webscraper_arn = output['OutputValue']
-            elif output['OutputKey'] == 'S3BucketName':
-                s3_bucket = output['OutputValue']
+        # Get the Lambda function name from stack outputs
+        outputs = stack_outputs or get_stack_outputs(config.get_stack_name())
+        webscraper_arn = outputs.get('WebScraperLambdaArn')
+        s3_bucket = outputs.get('S3BucketName')
+        status_bucket = outputs.get('ScrapeStatusBucketName')
         
         if not webscraper_arn:
             print("Error: WebScraperLambdaArn not found in stack outputs")
@@ -55,9 +114,13 @@ def invoke_webscraper(base_url, max_pages=200, max_workers=4, excluded_patterns=
             print("Error: S3BucketName not found in stack outputs")
             return False
         
+        if not status_bucket:
+            print("Error: ScrapeStatusBucketName not found in stack outputs")
+            return False
+        
         # Prepare the payload
         payload = {
-            'base_url': base_url,
+            **payload,
             's3_bucket': s3_bucket,
             'max_pages': max_pages,
             'max_workers': max_workers
@@ -66,62 +129,109 @@ def invoke_webscraper(base_url, max_pages=200, max_workers=4, excluded_patterns=
         if excluded_patterns:
             payload['excluded_patterns'] = excluded_patterns
         
-        print(f"Invoking web scraper for: {base_url}")
         print(f"S3 Bucket: {s3_bucket}")
         print(f"Max pages: {max_pages}")
         print(f"Max workers: {max_workers}")
         
-        # Invoke the Lambda function
-        response = lambda_client.invoke(
+        # Drop any markers from a previous run so waiting only sees these scrapes
+        keys = [{'Key': completion_marker_key(base_url)} for base_url in base_urls]
+        for i in range(0, len(keys), 1000):
+            s3_client().delete_objects(Bucket=status_bucket, Delete={'Objects': keys[i:i + 1000], 'Quiet': True})
+        
+        # Invoke the Lambda function asynchronously; it writes a completion marker per site when done
+        response = lambda_client().invoke(
             FunctionName=webscraper_arn,
-            InvocationType='RequestResponse',  # Synchronous invocation
+            InvocationType='Event',
             Payload=json.dumps(payload)
         )
         
-        # Parse the response
-        response_payload = json.loads(response['Payload'].read())
-        
-        if response['StatusCode'] == 200:
-            if response_payload.get('statusCode') == 200:
-                result = json.loads(response_payload['body'])
-                print("\nWeb scraping completed successfully!")
-                print(f"Pages crawled: {result.get('pages_crawled', 'N/A')}")
-                print(f"Files downloaded: {result.get('files_downloaded', 'N/A')}")
-                print(f"Base URL: {result.get('base_url', 'N/A')}")
-                return True
-            else:
-                print(f"\nWeb scraping failed: {response_payload.get('body', 'Unknown error')}")
-                return False
+        if response['StatusCode'] == 202:
+            return response['ResponseMetadata']['RequestId']
         else:
             print(f"\nLambda invocation failed with status code: {response['StatusCode']}")
             return False
             
-    except Exception as e:
+    except (BotoCoreError, ClientError) as e:
+        # Raised once the client's retries are exhausted
         print(f"Error invoking web scraper: {str(e)}")
         return False
 
-def sync_knowledge_base():
-    """Start knowledge base ingestion job."""
+def dispatch_levels(url_count):
+    """Number of dispatcher invocations between the driver and a scrape of url_count URLs"""
+    levels = 1
+    while url_count > DISPATCH_DIRECT_LIMIT:
+        url_count = math.ceil(math.sqrt(url_count))
+        levels += 1
+    return levels
+
+def wait_for_scrapes(base_urls, status_bucket, timeout=None, dispatch_levels=0):
+    """
+    Wait for the completion markers of asynchronously invoked scrapes
+    
+    Args:
+        base_urls (list): Base URLs whose scrapes were invoked
+        status_bucket (str): Bucket the scraper writes completion markers to
+        timeout (int): Seconds to wait (default: the scraper Lambda timeout plus a minute,
+            plus DISPATCH_HOP_ALLOWANCE per dispatch level)
+        dispatch_levels (int): Dispatcher hops before the scrapes start (0 for a direct invoke)
+    
+    Returns:
+        dict: Marker contents by base URL; URLs that never finished are absent
+    """
     config = get_config()
-    bedrock_agent = boto3.client('bedrock-agent')
+    s3 = s3_client()
+    pending = {completion_marker_key(base_url): base_url for base_url in base_urls}
+    results = {}
+    timeout = timeout or config.WEBSCRAPER_TIMEOUT + 60 + dispatch_levels * DISPATCH_HOP_ALLOWANCE
+    deadline = time.monotonic() + timeout
+    delay = POLL_INITIAL_DELAY
     
-    # Get knowledge base and data source IDs from stack outputs
-    cloudformation = boto3.client('cloudformation')
-    stack_name = config.get_stack_name()
+    while pending:
+        # One listing covers every outstanding scrape
+        paginator = s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=status_bucket, Prefix=COMPLETION_MARKER_PREFIX):
+            for obj in page.get('Contents', []):
+                base_url = pending.pop(obj['Key'], None)
+                if base_url:
+                    # Markers hold the scraper's result dict, so one parse of the raw bytes suffices
+                    marker = s3.get_object(Bucket=status_bucket, Key=obj['Key'])
+                    results[base_url] = json.loads(marker['Body'].read())
+        
+        remaining = deadline - time.monotonic()
+        if not pending or remaining <= 0:
+            break
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, POLL_MAX_DELAY)
+    
+    return results
+
+def report_scrape(base_url, result):
+    """Print a scrape's completion marker and return whether it succeeded"""
+    if result is None:
+        print(f"\nWeb scraping timed out: {base_url}")
+        return False
+    if result.get('statusCode') != 200:
+        print(f"\nWeb scraping failed: {result.get('error', 'Unknown error')}")
+        return False
+    print("\nWeb scraping completed successfully!")
+    print(f"Pages crawled: {result.get('pages_crawled', 'N/A')}")
+    print(f"Files downloaded: {result.get('files_downloaded', 'N/A')}")
+    print(f"Base URL: {result.get('base_url', 'N/A')}")
+    return True
+
+def knowledge_base_ids(stack_outputs):
+    """Return (kb_id, data_source_id) from the stack outputs, None where missing"""
+    data_source_id = None
+    if stack_outputs.get('DataSourceId'):
+        # The DataSource resource ref is "<kb_id>|<data_source_id>"
+        data_source_id = stack_outputs['DataSourceId'].split("|")[1]
+    return stack_outputs.get('KnowledgeBaseId'), data_source_id
+
+def sync_knowledge_base(kb_id, data_source_id):
+    """Start knowledge base ingestion job."""
+    bedrock_agent = bedrock_agent_client()
     
     try:
-        response = cloudformation.describe_stacks(StackName=stack_name)
-        outputs = response['Stacks'][0]['Outputs']
-        
-        kb_id = None
-        data_source_id = None
-        
-        for output in outputs:
-            if output['OutputKey'] == 'KnowledgeBaseId':
-                kb_id = output['OutputValue']
-            elif output['OutputKey'] == 'DataSourceId':
-                data_source_id = output['OutputValue'].split("|")[1]
-        
         if not kb_id or not data_source_id:
             print("Error: Knowledge Base or Data Source ID not found in stack outputs")
             return False
@@ -143,26 +253,6 @@ def sync_knowledge_base():
         print(f"Job ID: {job_id}")
         print(f"Status: {status}")
         
-        # Monitor initial status
-        time.sleep(5)
-        try:
-            status_response = bedrock_agent.get_ingestion_job(
-                knowledgeBaseId=kb_id,
-                dataSourceId=data_source_id,
-                ingestionJobId=job_id
-            )
-            
-            job = status_response['ingestionJob']
-            current_status = job['status']
-            print(f"Current Status: {current_status}")
-            
-            if 'statistics' in job:
-                stats = job['statistics']
-                if 'numberOfDocumentsScanned' in stats:
-                    print(f"Documents Scanned: {stats['numberOfDocumentsScanned']}")
-        except Exception:
-            pass
-        
         print(f"\nMonitor progress in AWS Bedrock Console")
         print(f"Ingestion typically takes 2-5 minutes")
         
@@ -186,14 +276,27 @@ def main():
     print("Web Scraper & Knowledge Base Sync")
     print("=" * 40)
     
+    # One DescribeStacks call serves the scrape and the sync
+    try:
+        stack_outputs = get_stack_outputs(get_config().get_stack_name())
+    except Exception as e:
+        print(f"Error reading stack outputs: {str(e)}")
+        sys.exit(1)
+    
     # Step 1: Run webscraper
     scraping_success = invoke_webscraper(
         base_url=args.base_url,
         max_pages=args.max_pages,
         max_workers=args.max_workers,
-        excluded_patterns=args.excluded_patterns or []
+        excluded_patterns=args.excluded_patterns or [],
+        stack_outputs=stack_outputs
     )
     
+    if scraping_success:
+        print("\nWaiting for web scraper to finish...")
+        results = wait_for_scrapes([args.base_url], stack_outputs['ScrapeStatusBucketName'])
+        scraping_success = report_scrape(args.base_url, results.get(args.base_url))
+    
     if not scraping_success:
         print("\nWebscraping failed. Exiting.")
         sys.exit(1)
@@ -204,7 +307,7 @@ def main():
         print("STARTING KNOWLEDGE BASE SYNC")
         print("=" * 40)
         
-        sync_success = sync_knowledge_base()
+        sync_success = sync_knowledge_base(*knowledge_base_ids(stack_outputs))
         
         if sync_success:
             print("\nProcess completed successfully!")
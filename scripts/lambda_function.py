@@ -1,8 +1,70 @@
 import json
-import boto3
-from opensearchpy import OpenSearch, RequestsHttpConnection, AWSV4SignerAuth
+import functools
+import logging
 import os
 
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# boto3 and opensearchpy are imported where first used, so Delete events and
+# the module load itself don't pay for them
+
+# Simplified index mapping that should work; serialized once and sent as-is
+INDEX_MAPPING = {
+    "settings": {
+        "index.knn": True
+    },
+    "mappings": {
+        "dynamic": True,
+        "properties": {
+            "embeddings": {
+                "type": "knn_vector",
+                "dimension": 1024,  # Titan Text Embedding v2 dimensions
+                "method": {
+                    "name": "hnsw",
+                    "space_type": "l2",
+                    "engine": "faiss",  # Required for Bedrock
+                    "parameters": {}
+                }
+            },
+            "AMAZON_BEDROCK_TEXT_CHUNK": {
+                "type": "text",
+                "fields": {"keyword": {"type": "keyword"}}
+            },
+            "AMAZON_BEDROCK_METADATA": {
+                "type": "text",
+                "index": True
+            }
+        }
+    }
+}
+INDEX_MAPPING_BODY = json.dumps(INDEX_MAPPING)
+
+# Connection pool size for the cached OpenSearch client
+OPENSEARCH_POOL_MAXSIZE = 16
+
+@functools.lru_cache(maxsize=None)
+def get_os_client(domain_endpoint, region):
+    """SigV4-signed OpenSearch client, built once per endpoint so warm invocations reuse its connections"""
+    import boto3
+    from opensearchpy import OpenSearch, RequestsHttpConnection, AWSV4SignerAuth
+    
+    service = "es"  # For managed clusters, use "es" not "aoss"
+    credentials = boto3.Session().get_credentials()
+    awsauth = AWSV4SignerAuth(credentials, region, service)
+    
+    return OpenSearch(
+        hosts=[{"host": domain_endpoint, "port": 443}],
+        http_auth=awsauth,
+        use_ssl=True,
+        verify_certs=True,
+        timeout=300,
+        http_compress=True,
+        pool_maxsize=OPENSEARCH_POOL_MAXSIZE,
+        connection_class=RequestsHttpConnection,
+    )
+
 def create_opensearch_index(domain_endpoint=None, index_name="chatbotindex", region="us-west-2"):
     # Use provided endpoint or get it automatically
     if not domain_endpoint:
@@ -15,53 +77,12 @@ def create_opensearch_index(domain_endpoint=None, index_name="chatbotindex", reg
     
     try:
         # Set up OpenSearch client with AWS auth
-        service = "es"  # For managed clusters, use "es" not "aoss"
-        credentials = boto3.Session().get_credentials()
-        awsauth = AWSV4SignerAuth(credentials, region, service)
-        
-        os_client = OpenSearch(
-            hosts=[{"host": domain_endpoint, "port": 443}],
-            http_auth=awsauth,
-            use_ssl=True,
-            verify_certs=True,
-            timeout=300,
-            connection_class=RequestsHttpConnection,
-        )
-        
-        # Simplified index mapping that should work
-        mapping = {
-            "settings": {
-                "index.knn": True
-            },
-            "mappings": {
-                "dynamic": True,
-                "properties": {
-                    "embeddings": {
-                        "type": "knn_vector",
-                        "dimension": 1024,  # Titan Text Embedding v2 dimensions
-                        "method": {
-                            "name": "hnsw",
-                            "space_type": "l2",
-                            "engine": "faiss",  # Required for Bedrock
-                            "parameters": {}
-                        }
-                    },
-                    "AMAZON_BEDROCK_TEXT_CHUNK": {
-                        "type": "text",
-                        "fields": {"keyword": {"type": "keyword"}}
-                    },
-                    "AMAZON_BEDROCK_METADATA": {
-                        "type": "text",
-                        "index": True
-                    }
-                }
-            }
-        }
+        os_client = get_os_client(domain_endpoint, region)
         
         # Check if index exists, create if not
         if not os_client.indices.exists(index=index_name):
             print(f"Index '{index_name}' does not exist. Creating...")
-            response = os_client.indices.create(index=index_name, body=mapping)
+            response = os_client.indices.create(index=index_name, body=INDEX_MAPPING_BODY)
             print(f"Create response: {response}")
             
             # Verify creation
@@ -74,28 +95,33 @@ def create_opensearch_index(domain_endpoint=None, index_name="chatbotindex", reg
         else:
             print(f"Index '{index_name}' already exists!")
             
-            # Optionally, get index info
-            try:
-                index_info = os_client.indices.get(index=index_name)
-                print(f"Index mapping: {json.dumps(index_info[index_name]['mappings'], indent=2, default=str)}")
-            except Exception as e:
-                print(f"Could not get index info: {e}")
+            # Fetching the mapping costs another round trip, so only do it when debugging
+            if os.environ.get('OS_DEBUG_MAPPING') == '1':
+                try:
+                    index_info = os_client.indices.get(index=index_name)
+                    print(f"Index mapping: {json.dumps(index_info[index_name]['mappings'], indent=2, default=str)}")
+                except Exception as e:
+                    print(f"Could not get index info: {e}")
             return True
             
     except Exception as e:
-        print(f"Error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Error: {str(e)}")
         return False
 
 def get_domain_endpoint():
     """Helper function to get your OpenSearch domain endpoint"""
+    # The stack passes the endpoint in directly; describe_domain is the fallback
+    endpoint = os.environ.get('DOMAIN_ENDPOINT')
+    if endpoint:
+        return endpoint
+    
+    from _clients import opensearch_client
+    
     try:
         domain_name = os.environ.get('DOMAIN_NAME', '')
         region = os.environ.get('REGION', 'us-west-2')
         
-        opensearch_client = boto3.client('opensearch', region_name=region)
-        response = opensearch_client.describe_domain(DomainName=domain_name)
+        response = opensearch_client(region).describe_domain(DomainName=domain_name)
         endpoint = response['DomainStatus']['Endpoint']
         print(f"Found domain endpoint: {endpoint}")
         return endpoint
@@ -154,9 +180,7 @@ def lambda_handler(event, context):
             }
             
     except Exception as e:
-        print(f"Lambda Error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Lambda Error: {str(e)}")
         return {
             'Status': 'FAILED',
             'Reason': f"Lambda failed: {str(e)}"
@@ -9,7 +9,10 @@ from pathlib import Path
 # Add parent directory to path to import config
 sys.path.append(str(Path(__file__).parent.parent))
 from config import get_config
-from scripts.invoke_webscraper import invoke_webscraper, sync_knowledge_base
+from scripts.invoke_webscraper import (
+    dispatch_webscrapers, sync_knowledge_base, knowledge_base_ids, get_stack_outputs,
+    wait_for_scrapes, report_scrape, dispatch_levels
+)
 
 def main():
     """Scrape all websites from config and sync knowledge base."""
@@ -22,44 +25,52 @@ def main():
         print("Add websites under lambda.webscraper.websites_to_scrape")
         sys.exit(1)
     
-    print("Starting batch webscraper...")
-    print(f"Found {len(websites)} websites to scrape:")
-    for i, url in enumerate(websites, 1):
-        print(f"  {i}. {url}")
-    print()
+    # Build multi-line output once and write it in a single call
+    site_list = "\n".join(f"  {i}. {url}" for i, url in enumerate(websites, 1))
+    print(f"Starting batch webscraper...\nFound {len(websites)} websites to scrape:\n{site_list}\n")
     
-    successful_scrapes = 0
+    # Resolve stack outputs once for every invocation and the sync
+    try:
+        stack_outputs = get_stack_outputs(config.get_stack_name())
+    except Exception as e:
+        print(f"Error reading stack outputs: {str(e)}")
+        sys.exit(1)
     
-    # Scrape each website
-    for i, base_url in enumerate(websites, 1):
-        print(f"[{i}/{len(websites)}] Scraping: {base_url}")
-        
-        success = invoke_webscraper(
-            base_url=base_url,
-            max_pages=config.WEBSCRAPER_MAX_PAGES,
-            max_workers=config.WEBSCRAPER_MAX_WORKERS,
-            excluded_patterns=[]
-        )
-        
-        if success:
+    # One dispatcher invocation fans out to a scraper run per website
+    if not dispatch_webscrapers(
+        websites,
+        max_pages=config.WEBSCRAPER_MAX_PAGES,
+        max_workers=config.WEBSCRAPER_MAX_WORKERS,
+        excluded_patterns=[],
+        stack_outputs=stack_outputs
+    ):
+        print("\nFailed to start web scraping.")
+        sys.exit(1)
+    
+    print(f"\nWaiting for {len(websites)} scrapes to finish...")
+    results = wait_for_scrapes(
+        websites, stack_outputs.get('ScrapeStatusBucketName'), dispatch_levels=dispatch_levels(len(websites))
+    )
+    
+    successful_scrapes = 0
+    for base_url in websites:
+        if report_scrape(base_url, results.get(base_url)):
             successful_scrapes += 1
-            print(f"Successfully scraped: {base_url}")
+            print(f"Successfully scraped: {base_url}\n{'-' * 50}")
         else:
-            print(f"Failed to scrape: {base_url}")
-        
-        print("-" * 50)
+            print(f"Failed to scrape: {base_url}\n{'-' * 50}")
     
-    print(f"\nScraping Summary:")
-    print(f"Total websites: {len(websites)}")
-    print(f"Successful: {successful_scrapes}")
-    print(f"Failed: {len(websites) - successful_scrapes}")
+    print(
+        f"\nScraping Summary:\n"
+        f"Total websites: {len(websites)}\n"
+        f"Successful: {successful_scrapes}\n"
+        f"Failed: {len(websites) - successful_scrapes}"
+    )
     
     if successful_scrapes > 0:
-        print("\n" + "=" * 50)
-        print("STARTING KNOWLEDGE BASE SYNC")
-        print("=" * 50)
+        print(f"\n{'=' * 50}\nSTARTING KNOWLEDGE BASE SYNC\n{'=' * 50}")
         
-        sync_success = sync_knowledge_base()
+        sync_success = sync_knowledge_base(*knowledge_base_ids(stack_outputs))
         
         if sync_success:
             print("\nAll done! Your chatbot now has access to the scraped content.")